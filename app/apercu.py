@@ -0,0 +1,157 @@
+"""
+Ce fichier implémente l'aperçu rapide de la répartition, affiché pendant le calcul de la
+répartition optimale. Deux heuristiques en temps quasi linéaire sont comparées :
+    - dictature_serielle: les auditeurs, dans l'ordre aléatoire de la répartition, prennent
+      chacun leur meilleur voeu encore disponible,
+    - glouton_par_rang: les voeux sont servis rang par rang (tous les 1er voeux, puis les 2ème, ...)
+      dans la limite des postes disponibles.
+
+La meilleure des deux est retenue, accompagnée d'une borne inférieure du coût optimal.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from utils import extraire_aretes_voeux
+from solveurs import capacites_villes, completer_hors_voeux
+from villes import Ville
+from typing import Dict, Any
+
+
+def dictature_serielle(
+    nb_auditeurs: int,
+    lignes: np.ndarray,
+    indices_villes: np.ndarray,
+    capacites: np.ndarray,
+) -> np.ndarray:
+    """Affecte chaque auditeur, dans l'ordre des lignes, à son meilleur voeu encore disponible.
+
+    Les arêtes doivent être triées par ligne puis par rang, comme celles d'extraire_aretes_voeux.
+
+    Returns:
+        np.ndarray: Indice de la ville affectée à chaque auditeur, -1 si aucun voeu n'est disponible
+    """
+    restants = capacites.copy()
+    affectation = np.full(nb_auditeurs, -1, dtype=np.int64)
+    for ligne, ville in zip(lignes.tolist(), indices_villes.tolist()):
+        if affectation[ligne] < 0 and restants[ville] > 0:
+            affectation[ligne] = ville
+            restants[ville] -= 1
+    return affectation
+
+
+def glouton_par_rang(
+    nb_auditeurs: int,
+    lignes: np.ndarray,
+    indices_villes: np.ndarray,
+    rangs: np.ndarray,
+    capacites: np.ndarray,
+) -> np.ndarray:
+    """Sert les voeux rang par rang, les auditeurs d'un même rang étant pris dans l'ordre des lignes.
+
+    Returns:
+        np.ndarray: Indice de la ville affectée à chaque auditeur, -1 si aucun voeu n'est disponible
+    """
+    ordre = np.lexsort((lignes, rangs))
+    return dictature_serielle(nb_auditeurs, lignes[ordre], indices_villes[ordre], capacites)
+
+
+def borne_inferieure(
+    nb_auditeurs: int,
+    lignes: np.ndarray,
+    indices_villes: np.ndarray,
+    rangs: np.ndarray,
+    couts: np.ndarray,
+    capacites: np.ndarray,
+    penalite: float,
+) -> float:
+    """Calcule une borne inférieure du coût de la répartition optimale.
+
+    Au plus U_k auditeurs peuvent obtenir l'un de leurs k premiers voeux, U_k étant le minimum entre
+    le nombre d'auditeurs ayant formulé un tel voeu et la somme, sur les villes, du minimum entre le
+    nombre de postes de la ville et le nombre d'auditeurs l'ayant placée dans leurs k premiers voeux.
+    Les autres paient au moins d_k, le plus petit coût d'un voeu de rang supérieur ou égal à k
+    (ou la pénalité), d'où : coût >= n x d_0 + somme_k (d_k - d_(k-1)) x (n - U_k).
+
+    Returns:
+        float: Borne inférieure du coût optimal
+    """
+    nb_rangs = int(rangs.max()) + 1 if len(rangs) else 0
+    # d_k : coût minimal d'un voeu de rang >= k, la pénalité au-delà du dernier rang
+    couts_min = np.full(nb_rangs + 1, float(penalite))
+    np.minimum.at(couts_min, rangs, couts.astype(np.float64))
+    couts_min = np.minimum.accumulate(couts_min[::-1])[::-1]
+
+    # Nombre d'auditeurs ayant placé chaque ville (colonnes) dans leurs k premiers voeux (lignes)
+    demandes = np.zeros((nb_rangs, len(capacites)), dtype=np.int64)
+    np.add.at(demandes, (rangs, indices_villes), 1)
+    demandes = np.cumsum(demandes, axis=0)
+    # Nombre d'auditeurs ayant au moins un voeu parmi les k premiers rangs
+    premier_rang = np.full(nb_auditeurs, nb_rangs)
+    np.minimum.at(premier_rang, lignes, rangs)
+    avec_voeu = np.cumsum(np.bincount(premier_rang, minlength=nb_rangs + 1))
+
+    borne = nb_auditeurs * couts_min[0]
+    for k in range(1, nb_rangs + 1):
+        places_max = min(avec_voeu[k - 1], np.minimum(capacites, demandes[k - 1]).sum())
+        borne += (couts_min[k] - couts_min[k - 1]) * (nb_auditeurs - places_max)
+    return float(borne)
+
+
+def apercu_glouton(
+    repartition_df: pd.DataFrame,
+    villes: Dict[str, Ville],
+    params_dict: Dict[str, Any],
+    methode: str,
+) -> Dict[str, Any]:
+    """Calcule un aperçu de la répartition à partir des mêmes voeux que creer_matrice_couts.
+
+    Args:
+        repartition_df (pd.DataFrame): DataFrame contenant les voeux des auditeurs, dans l'ordre aléatoire
+        villes (Dict[str, Ville]): Dictionnaire d'objets Ville
+        params_dict (Dict[str, Any]): Dictionnaire contenant les paramètres de configuration
+        methode (str): Méthode de calcul des coûts à utiliser
+
+    Returns:
+        Dict[str, Any]: Aperçu contenant :
+            - heuristique (str) : Heuristique retenue ('dictature_serielle' ou 'glouton_par_rang')
+            - affectation (np.ndarray) : Indice de la ville affectée à chaque ligne de repartition_df
+            - voeu_realise (np.ndarray) : Numéro du voeu réalisé de chaque ligne, 100 si hors voeux
+            - cout (float) : Coût de l'aperçu
+            - borne_inferieure (float) : Borne inférieure du coût optimal
+            - proportion_top_3, proportion_top_4, moyenne_globale (float) : Indicateurs de l'aperçu
+    """
+    nb_auditeurs = len(repartition_df)
+    penalite = float(params_dict["Penalite"])
+    capacites = capacites_villes(villes)
+    lignes, indices_villes, rangs, couts = extraire_aretes_voeux(
+        repartition_df, villes, params_dict, methode
+    )
+
+    meilleur = None
+    for heuristique, affectation in [
+        ("dictature_serielle", dictature_serielle(nb_auditeurs, lignes, indices_villes, capacites)),
+        ("glouton_par_rang", glouton_par_rang(nb_auditeurs, lignes, indices_villes, rangs, capacites)),
+    ]:
+        # Rang et coût du voeu réalisé de chaque auditeur
+        realises = indices_villes == affectation[lignes]
+        voeu_realise = np.full(nb_auditeurs, 100)
+        voeu_realise[lignes[realises]] = rangs[realises] + 1
+        cout = penalite * (nb_auditeurs - realises.sum()) + couts[realises].sum()
+        if meilleur is None or cout < meilleur["cout"]:
+            meilleur = {
+                "heuristique": heuristique,
+                "affectation": completer_hors_voeux(affectation, capacites),
+                "voeu_realise": voeu_realise,
+                "cout": float(cout),
+            }
+
+    voeu_realise = meilleur["voeu_realise"]
+    meilleur["borne_inferieure"] = borne_inferieure(
+        nb_auditeurs, lignes, indices_villes, rangs, couts, capacites, penalite
+    )
+    meilleur["proportion_top_3"] = 100 * (voeu_realise <= 3).mean()
+    meilleur["proportion_top_4"] = 100 * (voeu_realise <= 4).mean()
+    meilleur["moyenne_globale"] = voeu_realise.mean()
+    return meilleur
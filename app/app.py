@@ -11,7 +11,15 @@ import json
 import os
 import pandas as pd
 import sys
-from repartition import *
+from repartition import (
+    preparer_voeux,
+    verification_et_analyse_des_voeux,
+    executer_la_repartition,
+    apercu_de_la_repartition,
+    ajouter_valeurs_marginales,
+)
+from planification import SOLVEURS_NOMS
+from couts import construire_registre, valider_couts, METHODE_RANG_MAXIMAL
 
 # Path du fichier configuration
 CONFIG_PATH = "config"
@@ -23,12 +31,19 @@ def resource_path(relative_path):
 
 st.title("Stage Juridictionnel")
 
+
+@st.cache_data
+def charger_parametres(config_path):
+    """Charge le fichier de configuration une seule fois pour toutes les réexécutions du script."""
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"Configuration file not found at: {config_path}")
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 # Chargement et initialisation des paramètres depuis le fichier JSON
 config_path = resource_path(os.path.join(CONFIG_PATH, "parameters.json"))
-if not os.path.exists(config_path):
-    raise FileNotFoundError(f"Configuration file not found at: {config_path}")
-with open(config_path, "r", encoding="utf-8") as f:
-    params_dict = json.load(f)
+params_dict = charger_parametres(config_path)
 # Extraction des paramètres
 num_voeux = params_dict["Voeux"]  # Nombre maximum de voeux par auditeur
 noires_max = params_dict["Noires max"]  # Nombre maximum de villes noires
@@ -38,7 +53,13 @@ noires_ou_rouges_max = params_dict[
 vertes_min = params_dict["Vertes min"]  # Nombre minimum de villes vertes
 methode = params_dict["Methodes"]  # Méthode pour le calcul des coûts
 penalite = params_dict["Penalite"]  # Pénalité par défaut pour les affectations
-methods = ["linéaire", "carré", "exp"]  # Méthodes de calcul des coûts disponibles
+budget_memoire = params_dict["Budget memoire (Mo)"]  # Mémoire maximale pour la résolution
+# Méthodes de calcul des coûts disponibles
+try:
+    methods = list(construire_registre(params_dict)) + [METHODE_RANG_MAXIMAL]
+except ValueError as e:
+    st.error(f"Méthodes de coût personnalisées invalides dans {CONFIG_PATH}/parameters.json : {e}")
+    st.stop()
 
 # Section d'upload des fichiers pour les données des postes et des voeux
 uploaded = False
@@ -88,12 +109,33 @@ with st.sidebar:
         value=penalite,
         step=1000,
     )
+    params_dict["Budget memoire (Mo)"] = st.number_input(
+        "Budget mémoire de la résolution (Mo)",
+        min_value=64,
+        value=budget_memoire,
+        step=256,
+    )
+    params_dict["Matrices sur disque"] = st.toggle(
+        "Matrices de coûts sur disque",
+        value=params_dict["Matrices sur disque"],
+        help="Construit les matrices de coûts dans des fichiers projetés en mémoire, "
+        "réutilisés par les exécutions ayant les mêmes données. Ne s'applique que lorsque "
+        "l'algorithme hongrois (matrice dense) est retenu par la planification (onglet 'Résolution') ; "
+        "la matrice est comptée dans le budget mémoire comme une matrice en mémoire.",
+    )
     params_dict["Methodes"] = st.multiselect(
         "Méthode de calcul des coûts",
         methods,
         default=methode,
         placeholder="Selectionner la méthode de calcul des coûts",
     )
+    # Vérification des coûts de chaque méthode avant toute répartition
+    for methode_choisie in list(params_dict["Methodes"]):
+        try:
+            valider_couts(methode_choisie, params_dict)
+        except ValueError as e:
+            st.error(str(e))
+            params_dict["Methodes"].remove(methode_choisie)
 
 # Zone de contenu principale - affichée uniquement lorsque les fichiers sont téléchargés
 if not uploaded:
@@ -107,16 +149,7 @@ else:
     postes_df = pd.read_csv(postes_file)
     voeux_df = pd.read_csv(voeux_file)
     # Restriction des voeux à la valeur de params_dict["Voeux"]
-    available_v_columns = [col for col in voeux_df.columns if col.startswith("v_")]
-    needed_columns = ["id_auditeur"] + available_v_columns[: params_dict["Voeux"]]
-    voeux_df = voeux_df[needed_columns]
-
-    if voeux_libres:
-        nb_voeux = len([col for col in voeux_df.columns if col.startswith("v_")])
-        params_dict["Voeux"] = nb_voeux
-        params_dict["Noires max"] = nb_voeux
-        params_dict["Noires ou rouges max"] = nb_voeux
-        params_dict["Vertes min"] = 0
+    voeux_df = preparer_voeux(voeux_df, params_dict, voeux_libres)
 
     # Affichage des données dans des onglets
     postes_tab, voeux_tab = st.tabs(["Postes", "Voeux"])
@@ -152,7 +185,9 @@ else:
         ) = verification_et_analyse_des_voeux(postes_df, voeux_df, params_dict)
 
     with distribution_tab:
-        st.dataframe(postes_df)
+        # Complétée par les valeurs marginales des TJs après chaque répartition
+        distribution_placeholder = st.empty()
+        distribution_placeholder.dataframe(postes_df)
 
     with taux_tab:
         st.write(
@@ -176,44 +211,108 @@ else:
         st.pyplot(top_30_demandes)
         st.pyplot(top_30_voeux1)
 
-    # Exécution de la répartition pour chaque méthode sélectionnée
+    # Aperçu immédiat pour chaque méthode sélectionnée, remplacé par la répartition optimale une fois calculée
+    conteneurs = {}
+    apercus = {}
     for methode in params_dict["Methodes"]:
         st.divider()
         st.subheader(f"Répartition pour la méthode {methode}:")
-        # Exécution de la répartition et récupération des résultats
-        (
-            res_voeux_df,
-            proportions_voeux,
-            proportion_top_3,
-            proportion_top_4,
-            moyenne_globale,
-        ) = executer_la_repartition(
-            villes,
-            voeux_df,
-            nb_auditeurs,
-            nb_postes,
-            params_dict,
-            methode,
-            file_name=voeux_file.name,
-        )
+        conteneurs[methode] = st.container()
+        with conteneurs[methode]:
+            apercus[methode] = st.empty()
+            try:
+                apercu = apercu_de_la_repartition(villes, voeux_df, params_dict, methode)
+            except ValueError:
+                # L'erreur est affichée lors de la répartition
+                continue
+            with apercus[methode].container():
+                st.info(
+                    "Aperçu (heuristique gloutonne) en attendant la répartition optimale :\n"
+                    f"\n- {apercu['proportion_top_3']:.1f}% de la promo affectée à l'un de ses 3 premiers voeux,"
+                    f"\n- {apercu['proportion_top_4']:.1f}% de la promo affectée à l'un de ses 4 premiers voeux,"
+                    f"\n- Rang moyen du voeu réalisé : {apercu['moyenne_globale']:.2f},"
+                    f"\n- Coût de l'aperçu : {apercu['cout']:,.0f} ; "
+                    f"borne inférieure du coût optimal : {apercu['borne_inferieure']:,.0f}."
+                )
 
-        # Affichage des résultats dans des onglets
-        graph_repartition_tab, resultats_tab = st.tabs(["Graphiques", "Résultats"])
-        with graph_repartition_tab:
-            st.write("Proportion des affectations en fonction du voeu:")
-            chart, moyenne = st.columns(2)
-            with chart:
-                st.pyplot(proportions_voeux)
-            with moyenne:
-                st.write(
-                    f"- {proportion_top_3:.1f}% de la promo est affectée à l'un de ses 3 premiers voeux."
+    # Exécution de la répartition pour chaque méthode sélectionnée
+    for methode in params_dict["Methodes"]:
+        with conteneurs[methode]:
+            # Exécution de la répartition et récupération des résultats
+            try:
+                (
+                    res_voeux_df,
+                    proportions_voeux,
+                    proportion_top_3,
+                    proportion_top_4,
+                    moyenne_globale,
+                    plan,
+                    valeurs_marginales,
+                ) = executer_la_repartition(
+                    villes,
+                    voeux_df,
+                    nb_auditeurs,
+                    nb_postes,
+                    params_dict,
+                    methode,
+                    file_name=voeux_file.name,
                 )
+            except (MemoryError, ValueError) as e:
+                apercus[methode].empty()
+                st.error(str(e))
+                continue
+            apercus[methode].empty()
+            postes_df = ajouter_valeurs_marginales(
+                postes_df, valeurs_marginales, methode, params_dict["Penalite"]
+            )
+            distribution_placeholder.dataframe(postes_df)
+
+            # Affichage des résultats dans des onglets
+            graph_repartition_tab, resultats_tab, plan_tab = st.tabs(
+                ["Graphiques", "Résultats", "Résolution"]
+            )
+            with graph_repartition_tab:
+                st.write("Proportion des affectations en fonction du voeu:")
+                chart, moyenne = st.columns(2)
+                with chart:
+                    st.pyplot(proportions_voeux)
+                with moyenne:
+                    st.write(
+                        f"- {proportion_top_3:.1f}% de la promo est affectée à l'un de ses 3 premiers voeux."
+                    )
+                    st.write(
+                        f"- {proportion_top_4:.1f}% de la promo est affectée à l'un de ses 4 premiers voeux."
+                    )
+                    st.write(
+                        f"- Les auditeurs sont affectés en moyenne à leur {moyenne_globale:.2f}ème voeu."
+                    )
                 st.write(
-                    f"- {proportion_top_4:.1f}% de la promo est affectée à l'un de ses 4 premiers voeux."
+                    "TJs où un poste supplémentaire apporterait le plus "
+                    "(baisse du coût optimal, voir l'onglet 'Distribution des voeux') :"
                 )
+                st.dataframe(
+                    valeurs_marginales[valeurs_marginales > 0]
+                    .sort_values(ascending=False)
+                    .head(10)
+                    .rename("Valeur marginale")
+                )
+            with resultats_tab:
+                st.write("Affectations des auditeurs:")
+                resultats = st.dataframe(res_voeux_df[["assignation", "voeu_realise"]])
+            with plan_tab:
                 st.write(
-                    f"- Les auditeurs sont affectés en moyenne à leur {moyenne_globale:.2f}ème voeu."
+                    f"Solveur retenu : **{SOLVEURS_NOMS[plan['solveur']]}** "
+                    f"(budget mémoire : {plan['budget_mo']:.0f} Mo)."
+                )
+                st.write("Estimations pour chaque solveur:")
+                st.dataframe(
+                    pd.DataFrame(plan["estimations"])
+                    .T.rename(
+                        index=SOLVEURS_NOMS,
+                        columns={
+                            "memoire_mo": "Mémoire (Mo)",
+                            "temps_s": "Temps (s)",
+                            "dans_budget": "Dans le budget",
+                        },
+                    )
                 )
-        with resultats_tab:
-            st.write("Affectations des auditeurs:")
-            resultats = st.dataframe(res_voeux_df[["assignation", "voeu_realise"]])
@@ -0,0 +1,293 @@
+"""
+Ce fichier implémente le mode "balayage" : la répartition d'une promotion est comparée sur une grille
+de paramètres (Voeux, Noires max, Noires ou rouges max, Vertes min et méthodes de calcul des coûts).
+
+Les données de chaque auditeur (présence, existence, doublons et couleurs de ses voeux, cumulées
+rang par rang) sont calculées une seule fois ; la validité des voeux dans chaque scénario en est
+déduite par des opérations vectorisées, avec les mêmes règles que verification_voeux. Les scénarios
+aboutissant au même problème (mêmes voeux valides, même nombre de voeux et même méthode) ne sont
+résolus qu'une fois, les problèmes distincts étant répartis sur un pool de processus.
+
+La grille est donnée par un fichier JSON associant à chaque paramètre la liste des valeurs à essayer,
+les paramètres absents gardant leur valeur de config/parameters.json, par exemple :
+    {"Voeux": [6, 8], "Noires max": [2, 3], "Vertes min": [0, 1], "Methodes": ["linéaire", "carré"]}
+
+Utilisation:
+    python app/balayage.py <postes.csv> <voeux.csv> <grille.json> [--processus N] [--sortie dossier]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from repartition import (
+    CONFIG_PATH,
+    RESULTS_PATH,
+    initialiser_processus,
+    construire_villes,
+    executer_la_repartition,
+)
+from villes import Ville
+from typing import Dict, List, Tuple, Any
+
+# Paramètres pouvant varier dans la grille
+PARAMETRES_GRILLE = ["Voeux", "Noires max", "Noires ou rouges max", "Vertes min", "Methodes"]
+
+# Colonnes de la table de comparaison, après les paramètres de la grille
+COLONNES_COMPARAISON = [
+    "probleme",
+    "voeux_valides",
+    "voeux_invalides",
+    "solveur",
+    "nb_auditeurs",
+    "nb_postes",
+    "proportion_top_3",
+    "proportion_top_4",
+    "moyenne_globale",
+    "hors_voeux",
+    "duree_s",
+]
+
+
+def lister_scenarios(grille: Dict[str, List[Any]], params_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Développe la grille en la liste de tous ses scénarios (produit cartésien des valeurs).
+
+    Args:
+        grille (Dict[str, List[Any]]): Valeurs à essayer pour chaque paramètre de PARAMETRES_GRILLE
+        params_dict (Dict[str, Any]): Paramètres par défaut (config/parameters.json)
+
+    Returns:
+        List[Dict[str, Any]]: Valeur de chaque paramètre de la grille, "Methodes" étant une seule méthode
+
+    Raises:
+        ValueError: Si la grille contient un paramètre inconnu
+    """
+    inconnus = set(grille) - set(PARAMETRES_GRILLE)
+    if inconnus:
+        raise ValueError(f"Paramètre(s) inconnu(s) dans la grille : {sorted(inconnus)}")
+    valeurs = [grille.get(parametre, params_dict[parametre]) for parametre in PARAMETRES_GRILLE]
+    # Une valeur seule est acceptée à la place d'une liste
+    valeurs = [v if isinstance(v, list) else [v] for v in valeurs]
+    return [dict(zip(PARAMETRES_GRILLE, combinaison)) for combinaison in itertools.product(*valeurs)]
+
+
+def precalculer_voeux(
+    voeux_df: pd.DataFrame, postes_df: pd.DataFrame, nb_voeux_max: int
+) -> Dict[str, np.ndarray]:
+    """Calcule une seule fois, pour chaque auditeur et chaque rang k, les comptes cumulés sur ses k premiers voeux.
+
+    Args:
+        voeux_df (pd.DataFrame): DataFrame contenant les voeux des auditeurs (id_auditeur, v_1, v_2, ...)
+        postes_df (pd.DataFrame): DataFrame des postes (Ville, Postes, Couleur)
+        nb_voeux_max (int): Plus grand nombre de voeux de la grille
+
+    Returns:
+        Dict[str, np.ndarray]: Tableaux (nb_auditeurs, nb_voeux_max) des nombres cumulés de voeux
+            renseignés ('renseignes'), inconnus ('inconnus'), en doublon ('doublons'), de villes
+            noires ('noires'), rouges ('rouges') et vertes ('vertes')
+    """
+    colonnes = [col for col in voeux_df.columns if col.startswith("v_")][:nb_voeux_max]
+    voeux = voeux_df[colonnes].to_numpy(dtype=object)
+    # Rangs absents du fichier : voeux non renseignés
+    voeux = np.pad(voeux, ((0, 0), (0, nb_voeux_max - voeux.shape[1])), constant_values=np.nan)
+    renseignes = pd.notna(voeux)
+
+    # Codes des villes : -1 pour un voeu non renseigné
+    codes, _ = pd.factorize(pd.Series(voeux.ravel()))
+    codes = codes.reshape(voeux.shape)
+    couleurs = postes_df.drop_duplicates("Ville").set_index("Ville")["Couleur"]
+    couleurs_voeux = pd.Series(voeux.ravel()).map(couleurs).to_numpy().reshape(voeux.shape)
+
+    # Un voeu est en doublon s'il est égal à l'un des voeux renseignés de rang inférieur
+    doublons = np.zeros(voeux.shape, dtype=bool)
+    for k in range(1, nb_voeux_max):
+        doublons[:, k] = renseignes[:, k] & (codes[:, :k] == codes[:, k : k + 1]).any(axis=1)
+
+    comptes = {
+        "renseignes": renseignes,
+        "inconnus": renseignes & ~pd.Series(voeux.ravel()).isin(couleurs.index).to_numpy().reshape(voeux.shape),
+        "doublons": doublons,
+        "noires": couleurs_voeux == "noir",
+        "rouges": couleurs_voeux == "rouge",
+        "vertes": couleurs_voeux == "vert",
+    }
+    return {nom: np.cumsum(tableau, axis=1) for nom, tableau in comptes.items()}
+
+
+def masque_voeux_valides(precalcul: Dict[str, np.ndarray], scenario: Dict[str, Any]) -> np.ndarray:
+    """Détermine les auditeurs dont les voeux sont valides dans un scénario (règles de verification_voeux).
+
+    Args:
+        precalcul (Dict[str, np.ndarray]): Comptes cumulés calculés par precalculer_voeux
+        scenario (Dict[str, Any]): Valeurs des paramètres de la grille
+
+    Returns:
+        np.ndarray: Masque booléen des auditeurs ayant des voeux valides
+    """
+    k = scenario["Voeux"] - 1
+    noires = precalcul["noires"][:, k]
+    return (
+        (precalcul["renseignes"][:, k] == scenario["Voeux"])
+        & (precalcul["inconnus"][:, k] == 0)
+        & (precalcul["doublons"][:, k] == 0)
+        & (noires <= scenario["Noires max"])
+        & (noires + precalcul["rouges"][:, k] <= scenario["Noires ou rouges max"])
+        & (precalcul["vertes"][:, k] >= scenario["Vertes min"])
+    )
+
+
+def resoudre_probleme(
+    villes: Dict[str, Ville],
+    voeux_df: pd.DataFrame,
+    nb_postes: int,
+    params_dict: Dict[str, Any],
+    methode: str,
+    dossier: str,
+) -> Dict[str, Any]:
+    """Exécute la répartition d'un problème distinct du balayage, dans un processus du pool.
+
+    Returns:
+        Dict[str, Any]: Solveur retenu et indicateurs de la répartition
+    """
+    os.makedirs(dossier, exist_ok=True)
+    debut = time.perf_counter()
+    res_voeux_df, _, proportion_top_3, proportion_top_4, moyenne_globale, plan, _ = (
+        executer_la_repartition(
+            villes,
+            voeux_df,
+            len(voeux_df),
+            nb_postes,
+            params_dict,
+            methode,
+            file_name="balayage.csv",
+            dossier_resultats=dossier,
+            graphiques=False,
+        )
+    )
+    return {
+        "solveur": plan["solveur"],
+        "nb_auditeurs": len(voeux_df),
+        "nb_postes": int(nb_postes),
+        "proportion_top_3": float(proportion_top_3),
+        "proportion_top_4": float(proportion_top_4),
+        "moyenne_globale": float(moyenne_globale),
+        "hors_voeux": int((res_voeux_df["voeu_realise"] == 100).sum()),
+        "duree_s": time.perf_counter() - debut,
+    }
+
+
+def executer_balayage(
+    postes_df: pd.DataFrame,
+    voeux_df: pd.DataFrame,
+    grille: Dict[str, List[Any]],
+    params_dict: Dict[str, Any],
+    dossier_sortie: str,
+    processus: int | None = None,
+) -> pd.DataFrame:
+    """Compare la répartition d'une promotion sur tous les scénarios d'une grille de paramètres.
+
+    Args:
+        postes_df (pd.DataFrame): DataFrame des postes (Ville, Postes, Couleur)
+        voeux_df (pd.DataFrame): DataFrame contenant les voeux des auditeurs (id_auditeur, v_1, v_2, ...)
+        grille (Dict[str, List[Any]]): Valeurs à essayer pour chaque paramètre (voir lister_scenarios)
+        params_dict (Dict[str, Any]): Paramètres par défaut (config/parameters.json)
+        dossier_sortie (str): Dossier des résultats, un sous-dossier par problème distinct
+        processus (int | None): Nombre de processus, par défaut le nombre de processeurs
+
+    Returns:
+        pd.DataFrame: Une ligne par scénario, également sauvegardée dans comparaison_balayage.csv
+    """
+    scenarios = lister_scenarios(grille, params_dict)
+    precalcul = precalculer_voeux(voeux_df, postes_df, max(s["Voeux"] for s in scenarios))
+
+    villes = construire_villes(postes_df)
+    nb_postes = postes_df["Postes"].sum()
+    colonnes = [col for col in voeux_df.columns if col.startswith("v_")]
+
+    # Regroupement des scénarios par problème : (nombre de voeux, méthode, auditeurs valides)
+    problemes: Dict[Tuple[int, str, str], List[int]] = {}
+    masques = []
+    for i, scenario in enumerate(scenarios):
+        masques.append(masque_voeux_valides(precalcul, scenario))
+        empreinte = hashlib.sha256(np.packbits(masques[-1]).tobytes()).hexdigest()
+        problemes.setdefault((scenario["Voeux"], scenario["Methodes"], empreinte), []).append(i)
+
+    processus = processus or os.cpu_count() or 1
+    params_probleme = dict(
+        params_dict, **{"Budget memoire (Mo)": params_dict["Budget memoire (Mo)"] / processus}
+    )
+    resultats = {}
+    with ProcessPoolExecutor(max_workers=processus, initializer=initialiser_processus) as pool:
+        taches = {}
+        for numero, ((nb_voeux, methode, _), indices) in enumerate(problemes.items()):
+            # Voeux du problème : les nb_voeux premiers, ceux des auditeurs aux voeux invalides étant retirés
+            voeux_probleme = voeux_df[["id_auditeur"] + colonnes[:nb_voeux]].set_index("id_auditeur")
+            voeux_probleme.loc[~masques[indices[0]], :] = np.nan
+            dossier = os.path.join(dossier_sortie, f"probleme_{numero}")
+            tache = pool.submit(
+                resoudre_probleme,
+                villes,
+                voeux_probleme,
+                nb_postes,
+                dict(params_probleme, Voeux=nb_voeux),
+                methode,
+                dossier,
+            )
+            taches[tache] = (numero, indices)
+        for tache in as_completed(taches):
+            numero, indices = taches[tache]
+            try:
+                resultat = tache.result()
+            except Exception as e:
+                print(f"ERREUR ! Problème {numero} (scénarios {indices}) : {e}")
+                continue
+            for i in indices:
+                resultats[i] = dict(resultat, probleme=numero)
+
+    lignes = []
+    for i, scenario in enumerate(scenarios):
+        valides = int(masques[i].sum())
+        lignes.append(
+            dict(
+                scenario,
+                voeux_valides=valides,
+                voeux_invalides=len(masques[i]) - valides,
+                **resultats.get(i, {}),
+            )
+        )
+    comparaison = pd.DataFrame(lignes, columns=PARAMETRES_GRILLE + COLONNES_COMPARAISON)
+    comparaison.to_csv(os.path.join(dossier_sortie, "comparaison_balayage.csv"), index=False)
+    return comparaison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Balayage d'une grille de paramètres de répartition")
+    parser.add_argument("postes", help="Fichier CSV des postes")
+    parser.add_argument("voeux", help="Fichier CSV des voeux")
+    parser.add_argument("grille", help="Fichier JSON de la grille de paramètres")
+    parser.add_argument("--processus", type=int, default=None, help="Nombre de processus")
+    parser.add_argument("--sortie", default=os.path.join(RESULTS_PATH, "balayage"), help="Dossier des résultats")
+    args = parser.parse_args()
+
+    initialiser_processus()
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        params_dict = json.load(f)
+    with open(args.grille, "r", encoding="utf-8") as f:
+        grille = json.load(f)
+    os.makedirs(args.sortie, exist_ok=True)
+    comparaison = executer_balayage(
+        pd.read_csv(args.postes),
+        pd.read_csv(args.voeux),
+        grille,
+        params_dict,
+        args.sortie,
+        args.processus,
+    )
+    print(comparaison.to_string(index=False))
@@ -0,0 +1,208 @@
+"""
+Ce fichier implémente le registre des méthodes de calcul des coûts.
+
+Une méthode de coût est une fonction vectorisée qui, à partir des rangs des voeux (0 pour le
+1er voeu) et des couleurs des villes demandées, renvoie le coût de chaque voeu. Elle est appliquée
+en une seule fois à l'ensemble des voeux lors de la construction des coûts.
+
+La méthode "rang maximal" n'utilise pas de coûts et ne fait pas partie du registre.
+
+Aux méthodes intégrées (linéaire, carré, exp) s'ajoutent les méthodes déclarées dans la clé
+"Couts personnalises" de parameters.json, par exemple :
+    "Couts personnalises": {
+        "table": {"type": "table", "valeurs": [0, 1, 3, 6, 10, 15, 21, 28]},
+        "par morceaux": {"type": "par_morceaux", "rangs": [0, 3, 7], "couts": [0, 3, 30]},
+        "carré plafonné": {"type": "plafonne", "base": "carré", "plafond": 25},
+        "linéaire pondéré": {"type": "couleur", "base": "linéaire", "poids": {"noir": 2, "rouge": 1.5}}
+    }
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Iterable, Any, Optional
+
+FonctionCout = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+# Couleurs usuelles des villes, toujours vérifiées lors de la validation des méthodes
+COULEURS = ["noir", "rouge", "vert", "blanc"]
+
+# Méthode sans coût : profil des rangs le meilleur au sens lexicographique (voir solveurs.resoudre_rang_maximal)
+METHODE_RANG_MAXIMAL = "rang maximal"
+
+
+def cout_lineaire(rangs: np.ndarray, couleurs: np.ndarray) -> np.ndarray:
+    """Coût égal au rang du voeu."""
+    return rangs.astype(np.float64)
+
+
+def cout_carre(rangs: np.ndarray, couleurs: np.ndarray) -> np.ndarray:
+    """Coût égal au carré du rang du voeu."""
+    return rangs.astype(np.float64) ** 2
+
+
+def cout_exp(rangs: np.ndarray, couleurs: np.ndarray) -> np.ndarray:
+    """Coût égal à l'exponentielle du rang du voeu."""
+    return np.exp(rangs.astype(np.float64))
+
+
+# Méthodes de calcul des coûts intégrées
+COUTS_INTEGRES: Dict[str, FonctionCout] = {
+    "linéaire": cout_lineaire,
+    "carré": cout_carre,
+    "exp": cout_exp,
+}
+
+
+def poids_couleurs(couleurs: np.ndarray, poids: Dict[str, float]) -> np.ndarray:
+    """Renvoie le poids de chaque couleur (1 pour une couleur sans poids), une recherche par couleur distincte.
+
+    Args:
+        couleurs (np.ndarray): Couleur de la ville de chaque voeu
+        poids (Dict[str, float]): Poids de chaque couleur
+
+    Returns:
+        np.ndarray: Poids de chaque voeu, de même dimension que couleurs
+    """
+    couleurs = np.asarray(couleurs, dtype=object)
+    # Code -1 pour une couleur manquante, associé au dernier poids (1)
+    codes, distinctes = pd.factorize(couleurs.ravel())
+    poids_distincts = np.array([float(poids.get(c, 1.0)) for c in distinctes] + [1.0], dtype=np.float64)
+    return poids_distincts[codes].reshape(couleurs.shape)
+
+
+def creer_cout_personnalise(
+    nom: str, definition: Dict[str, Any], registre: Dict[str, FonctionCout]
+) -> FonctionCout:
+    """Crée la fonction de coût correspondant à une méthode déclarée dans parameters.json.
+
+    Args:
+        nom (str): Nom de la méthode
+        definition (Dict[str, Any]): Définition de la méthode, dont le champ "type" vaut
+            'table', 'par_morceaux', 'plafonne' ou 'couleur'
+        registre (Dict[str, FonctionCout]): Méthodes déjà définies, utilisables comme "base"
+
+    Returns:
+        FonctionCout: Fonction vectorisée (rangs, couleurs) -> coûts
+
+    Raises:
+        ValueError: Si la définition est incomplète, incohérente (table vide, rangs non strictement
+            croissants ou de longueur différente des coûts) ou de type inconnu
+    """
+    type_cout = definition.get("type")
+    try:
+        if type_cout == "table":
+            valeurs = np.asarray(definition["valeurs"], dtype=np.float64)
+            if valeurs.ndim != 1 or len(valeurs) == 0:
+                raise ValueError(f"Méthode de coût '{nom}' : 'valeurs' doit être une liste non vide")
+            # Au-delà de la table, le coût du dernier rang est conservé
+            return lambda rangs, couleurs: valeurs[np.minimum(rangs, len(valeurs) - 1)]
+        if type_cout == "par_morceaux":
+            points_rangs = np.asarray(definition["rangs"], dtype=np.float64)
+            points_couts = np.asarray(definition["couts"], dtype=np.float64)
+            if points_rangs.ndim != 1 or len(points_rangs) == 0 or points_rangs.shape != points_couts.shape:
+                raise ValueError(
+                    f"Méthode de coût '{nom}' : 'rangs' et 'couts' doivent être des listes non vides de même longueur"
+                )
+            # np.interp suppose des abscisses croissantes et renvoie sinon des coûts faux sans erreur
+            if np.any(np.diff(points_rangs) <= 0):
+                raise ValueError(f"Méthode de coût '{nom}' : 'rangs' doit être strictement croissant")
+            return lambda rangs, couleurs: np.interp(rangs, points_rangs, points_couts)
+        if type_cout == "plafonne":
+            base = registre[definition["base"]]
+            plafond = float(definition["plafond"])
+            return lambda rangs, couleurs: np.minimum(base(rangs, couleurs), plafond)
+        if type_cout == "couleur":
+            base = registre[definition["base"]]
+            poids = {couleur: float(valeur) for couleur, valeur in definition["poids"].items()}
+            return lambda rangs, couleurs: base(rangs, couleurs) * poids_couleurs(couleurs, poids)
+    except KeyError as e:
+        raise ValueError(f"Méthode de coût '{nom}' : champ ou méthode de base inconnu {e}")
+    raise ValueError(f"Méthode de coût '{nom}' : type inconnu '{type_cout}'")
+
+
+def construire_registre(params_dict: Dict[str, Any]) -> Dict[str, FonctionCout]:
+    """Construit le registre des méthodes de coût : méthodes intégrées et méthodes personnalisées.
+
+    Les méthodes personnalisées sont créées dans l'ordre de parameters.json : une méthode peut
+    utiliser comme base une méthode intégrée ou une méthode personnalisée déclarée avant elle.
+
+    Args:
+        params_dict (Dict[str, Any]): Dictionnaire contenant les paramètres de configuration
+
+    Returns:
+        Dict[str, FonctionCout]: Méthodes de coût indexées par leur nom
+    """
+    registre = dict(COUTS_INTEGRES)
+    for nom, definition in params_dict.get("Couts personnalises", {}).items():
+        registre[nom] = creer_cout_personnalise(nom, definition, registre)
+    return registre
+
+
+def calculer_couts(
+    methode: str, rangs: np.ndarray, couleurs: np.ndarray, params_dict: Dict[str, Any]
+) -> np.ndarray:
+    """Calcule en une seule fois le coût de chaque voeu, en float64 (les coûts fractionnaires sont conservés).
+
+    Args:
+        methode (str): Méthode de calcul des coûts
+        rangs (np.ndarray): Rang de chaque voeu (0 pour le premier voeu)
+        couleurs (np.ndarray): Couleur de la ville de chaque voeu
+        params_dict (Dict[str, Any]): Dictionnaire contenant les paramètres de configuration
+
+    Returns:
+        np.ndarray: Coût de chaque voeu
+
+    Raises:
+        ValueError: Si une méthode inconnue est spécifiée
+    """
+    registre = construire_registre(params_dict)
+    if methode not in registre:
+        raise ValueError(f"Méthode inconnue: {methode}")
+    couts = registre[methode](np.asarray(rangs), np.asarray(couleurs, dtype=object))
+    return np.asarray(couts, dtype=np.float64)
+
+
+def valider_couts(
+    methode: str, params_dict: Dict[str, Any], couleurs_villes: Optional[Iterable[Any]] = None
+) -> None:
+    """Vérifie, avant toute répartition, que les coûts d'une méthode sont utilisables.
+
+    Les coûts de tous les rangs (jusqu'à params_dict["Voeux"]) et de toutes les couleurs doivent
+    être finis, positifs et strictement inférieurs à la pénalité d'une affectation hors voeux.
+    Les couleurs vérifiées sont celles de COULEURS, toutes celles pondérées par une méthode
+    personnalisée, une couleur manquante et, si elles sont connues, celles des villes.
+
+    Args:
+        methode (str): Méthode de calcul des coûts
+        params_dict (Dict[str, Any]): Dictionnaire contenant les paramètres de configuration
+        couleurs_villes (Optional[Iterable[Any]]): Couleurs des villes de la répartition
+
+    Raises:
+        ValueError: Si la méthode est inconnue ou si ses coûts ne respectent pas ces contraintes
+    """
+    if methode == METHODE_RANG_MAXIMAL:
+        return
+    registre = construire_registre(params_dict)
+    if methode not in registre:
+        raise ValueError(f"Méthode inconnue: {methode}")
+    penalite = float(params_dict["Penalite"])
+    distinctes = list(COULEURS) + [None]
+    for definition in params_dict.get("Couts personnalises", {}).values():
+        distinctes.extend(definition.get("poids", {}))
+    distinctes.extend(couleurs_villes if couleurs_villes is not None else [])
+    distinctes = list(pd.unique(np.array(distinctes, dtype=object)))
+    rangs = np.repeat(np.arange(params_dict["Voeux"]), len(distinctes))
+    couleurs = np.array(distinctes * params_dict["Voeux"], dtype=object)
+    with np.errstate(over="ignore", invalid="ignore"):
+        couts = np.asarray(registre[methode](rangs, couleurs), dtype=np.float64)
+
+    if not np.all(np.isfinite(couts)):
+        raise ValueError(f"Méthode '{methode}' : coûts infinis ou indéfinis (dépassement de capacité)")
+    if np.any(couts < 0):
+        raise ValueError(f"Méthode '{methode}' : coûts négatifs")
+    if couts.max() >= penalite:
+        raise ValueError(
+            f"Méthode '{methode}' : le coût maximal ({couts.max():.3g}) atteint la pénalité ({penalite:.3g})"
+        )
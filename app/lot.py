@@ -0,0 +1,232 @@
+"""
+Ce fichier implémente le mode "lot" : la répartition est relancée sur un ensemble de promotions
+archivées et de jeux de paramètres, en parallèle sur plusieurs processus, et les résultats sont
+rassemblés dans une seule table de comparaison.
+
+Les promotions sont données soit par un dossier contenant des paires de fichiers
+postes_<promotion>.csv / voeux_<promotion>.csv, soit par un manifeste CSV de colonnes
+promotion, postes, voeux (chemins relatifs au manifeste).
+
+Les jeux de paramètres sont donnés par un fichier JSON contenant une liste d'objets, chacun
+ayant un "nom" et les paramètres de config/parameters.json à modifier (ainsi que "Voeux libres").
+
+Utilisation:
+    python app/lot.py <dossier|manifeste.csv> [--parametres jeux.json] [--processus N] [--sortie dossier]
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from repartition import (
+    CONFIG_PATH,
+    RESULTS_PATH,
+    initialiser_processus,
+    preparer_voeux,
+    verification_et_analyse_des_voeux,
+    executer_la_repartition,
+)
+from typing import Dict, List, Any
+
+# Colonnes de la table de comparaison
+COLONNES_COMPARAISON = [
+    "promotion",
+    "jeu",
+    "methode",
+    "solveur",
+    "nb_auditeurs",
+    "nb_postes",
+    "proportion_top_3",
+    "proportion_top_4",
+    "moyenne_globale",
+    "hors_voeux",
+    "duree_s",
+    "erreur",
+]
+
+
+def lister_promotions(source: str) -> List[Dict[str, str]]:
+    """Liste les promotions à traiter à partir d'un dossier ou d'un manifeste CSV.
+
+    Args:
+        source (str): Dossier contenant des fichiers postes_<promotion>.csv et voeux_<promotion>.csv,
+            ou manifeste CSV de colonnes promotion, postes, voeux
+
+    Returns:
+        List[Dict[str, str]]: Pour chaque promotion, son nom et les chemins des fichiers postes et voeux
+
+    Raises:
+        FileNotFoundError: Si un fichier de voeux est manquant ou si aucune promotion n'est trouvée
+    """
+    promotions = []
+    if os.path.isdir(source):
+        for chemin_postes in sorted(glob.glob(os.path.join(source, "postes_*.csv"))):
+            nom = os.path.basename(chemin_postes)[len("postes_"):-len(".csv")]
+            chemin_voeux = os.path.join(source, f"voeux_{nom}.csv")
+            if not os.path.exists(chemin_voeux):
+                raise FileNotFoundError(f"Fichier de voeux manquant pour la promotion {nom}: {chemin_voeux}")
+            promotions.append({"promotion": nom, "postes": chemin_postes, "voeux": chemin_voeux})
+    else:
+        dossier = os.path.dirname(os.path.abspath(source))
+        for _, row in pd.read_csv(source).iterrows():
+            promotions.append(
+                {
+                    "promotion": str(row["promotion"]),
+                    "postes": os.path.join(dossier, row["postes"]),
+                    "voeux": os.path.join(dossier, row["voeux"]),
+                }
+            )
+    if not promotions:
+        raise FileNotFoundError(f"Aucune promotion trouvée dans {source}")
+    return promotions
+
+
+def charger_jeux_parametres(chemin: str | None, params_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Construit les jeux de paramètres à partir des paramètres par défaut et du fichier JSON des jeux.
+
+    Args:
+        chemin (str | None): Fichier JSON contenant une liste de jeux de paramètres, ou None
+        params_dict (Dict[str, Any]): Paramètres par défaut (config/parameters.json)
+
+    Returns:
+        List[Dict[str, Any]]: Jeux de paramètres complets, chacun ayant un "nom"
+    """
+    if chemin is None:
+        return [dict(params_dict, nom="defaut")]
+    with open(chemin, "r", encoding="utf-8") as f:
+        jeux = json.load(f)
+    return [dict(params_dict, **jeu) for jeu in jeux]
+
+
+def executer_promotion(
+    promotion: Dict[str, str], jeu: Dict[str, Any], dossier: str
+) -> List[Dict[str, Any]]:
+    """Vérifie les voeux d'une promotion puis exécute la répartition pour chaque méthode du jeu.
+
+    Args:
+        promotion (Dict[str, str]): Nom de la promotion et chemins des fichiers postes et voeux
+        jeu (Dict[str, Any]): Jeu de paramètres (voir charger_jeux_parametres)
+        dossier (str): Dossier où sont écrits les résultats de cette promotion et de ce jeu
+
+    Returns:
+        List[Dict[str, Any]]: Une ligne de la table de comparaison par méthode
+    """
+    os.makedirs(dossier, exist_ok=True)
+    params_dict = dict(jeu)
+    postes_df = pd.read_csv(promotion["postes"])
+    voeux_df = preparer_voeux(
+        pd.read_csv(promotion["voeux"]), params_dict, params_dict.get("Voeux libres", False)
+    )
+    villes, postes_df, voeux_df, nb_postes, nb_auditeurs, *_ = verification_et_analyse_des_voeux(
+        postes_df, voeux_df, params_dict, dossier_resultats=dossier, graphiques=False
+    )
+
+    lignes = []
+    for methode in params_dict["Methodes"]:
+        debut = time.perf_counter()
+        res_voeux_df, _, proportion_top_3, proportion_top_4, moyenne_globale, plan, _ = (
+            executer_la_repartition(
+                villes,
+                voeux_df,
+                nb_auditeurs,
+                nb_postes,
+                params_dict,
+                methode,
+                file_name=os.path.basename(promotion["voeux"]),
+                dossier_resultats=dossier,
+                graphiques=False,
+            )
+        )
+        lignes.append(
+            {
+                "promotion": promotion["promotion"],
+                "jeu": jeu["nom"],
+                "methode": methode,
+                "solveur": plan["solveur"],
+                "nb_auditeurs": int(nb_auditeurs),
+                "nb_postes": int(nb_postes),
+                "proportion_top_3": float(proportion_top_3),
+                "proportion_top_4": float(proportion_top_4),
+                "moyenne_globale": float(moyenne_globale),
+                "hors_voeux": int((res_voeux_df["voeu_realise"] == 100).sum()),
+                "duree_s": time.perf_counter() - debut,
+            }
+        )
+    return lignes
+
+
+def executer_lot(
+    promotions: List[Dict[str, str]],
+    jeux: List[Dict[str, Any]],
+    dossier_sortie: str,
+    processus: int | None = None,
+) -> pd.DataFrame:
+    """Exécute la répartition de chaque promotion avec chaque jeu de paramètres sur un pool de processus.
+
+    Le budget mémoire de chaque jeu est réparti entre les processus, qui s'exécutent simultanément.
+
+    Args:
+        promotions (List[Dict[str, str]]): Promotions à traiter (voir lister_promotions)
+        jeux (List[Dict[str, Any]]): Jeux de paramètres (voir charger_jeux_parametres)
+        dossier_sortie (str): Dossier des résultats, un sous-dossier par promotion et par jeu
+        processus (int | None): Nombre de processus, par défaut le nombre de processeurs
+
+    Returns:
+        pd.DataFrame: Table de comparaison, également sauvegardée dans comparaison_lot.csv ; une
+            exécution en échec y figure sur une ligne renseignant seulement la colonne "erreur"
+    """
+    processus = processus or os.cpu_count() or 1
+    lignes = []
+    with ProcessPoolExecutor(max_workers=processus, initializer=initialiser_processus) as pool:
+        taches = {}
+        for promotion in promotions:
+            for jeu in jeux:
+                jeu = dict(jeu, **{"Budget memoire (Mo)": jeu["Budget memoire (Mo)"] / processus})
+                dossier = os.path.join(dossier_sortie, promotion["promotion"], jeu["nom"])
+                taches[pool.submit(executer_promotion, promotion, jeu, dossier)] = (promotion, jeu)
+        for tache in as_completed(taches):
+            promotion, jeu = taches[tache]
+            try:
+                lignes.extend(tache.result())
+            except Exception as e:
+                print(f"ERREUR ! Promotion {promotion['promotion']}, jeu {jeu['nom']} : {e}")
+                lignes.append(
+                    {
+                        "promotion": promotion["promotion"],
+                        "jeu": jeu["nom"],
+                        "erreur": f"{type(e).__name__}: {e}",
+                    }
+                )
+
+    comparaison = pd.DataFrame(lignes, columns=COLONNES_COMPARAISON).sort_values(
+        ["promotion", "jeu", "methode"]
+    )
+    # Entiers nullables : les lignes en échec n'ont pas de résultats
+    comparaison = comparaison.astype({"nb_auditeurs": "Int64", "nb_postes": "Int64", "hors_voeux": "Int64"})
+    comparaison.to_csv(os.path.join(dossier_sortie, "comparaison_lot.csv"), index=False)
+    return comparaison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Répartition en lot de promotions archivées")
+    parser.add_argument("source", help="Dossier des promotions ou manifeste CSV")
+    parser.add_argument("--parametres", default=None, help="Fichier JSON des jeux de paramètres")
+    parser.add_argument("--processus", type=int, default=None, help="Nombre de processus")
+    parser.add_argument("--sortie", default=os.path.join(RESULTS_PATH, "lot"), help="Dossier des résultats")
+    args = parser.parse_args()
+
+    initialiser_processus()
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        params_dict = json.load(f)
+    comparaison = executer_lot(
+        lister_promotions(args.source),
+        charger_jeux_parametres(args.parametres, params_dict),
+        args.sortie,
+        args.processus,
+    )
+    print(comparaison.to_string(index=False))
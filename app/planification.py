@@ -0,0 +1,134 @@
+"""
+Ce fichier implémente la planification de la résolution : avant toute allocation, la mémoire et
+le temps de calcul de chaque solveur (voir solveurs.py) sont estimés à partir des dimensions du
+problème, et le solveur le plus rapide respectant le budget mémoire est retenu.
+
+Les estimations sont des ordres de grandeur, calibrés sur les implémentations de scipy.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Any
+
+# Nom affiché de chaque solveur
+SOLVEURS_NOMS = {
+    "hongrois_dense": "Algorithme hongrois (matrice dense)",
+    "couplage_creux": "Couplage creux",
+    "flot_villes": "Flot au niveau des villes",
+    "rang_maximal": "Rang maximal (flots successifs)",
+}
+
+MO = 1024 * 1024
+
+
+def verifier_nombre_postes(nb_auditeurs: int, nb_postes: int) -> None:
+    """Vérifie que chaque auditeur peut recevoir un poste, dans ses voeux ou hors voeux.
+
+    Raises:
+        ValueError: S'il y a moins de postes que d'auditeurs
+    """
+    if nb_postes < nb_auditeurs:
+        raise ValueError(
+            f"Nombre de postes insuffisant : {nb_postes} postes pour {nb_auditeurs} auditeurs."
+        )
+
+
+def estimer_solveurs(
+    nb_auditeurs: int,
+    nb_postes: int,
+    nb_villes: int,
+    nb_voeux: int,
+) -> Dict[str, Dict[str, float]]:
+    """Estime la mémoire (Mo) et le temps (s) de chaque solveur à partir des dimensions du problème.
+
+    Args:
+        nb_auditeurs (int): Nombre total d'auditeurs
+        nb_postes (int): Nombre total de postes disponibles
+        nb_villes (int): Nombre de villes ayant au moins un poste
+        nb_voeux (int): Nombre de voeux par auditeur
+
+    Returns:
+        Dict[str, Dict[str, float]]: Pour chaque solveur, 'memoire_mo' et 'temps_s'
+    """
+    n, m = nb_auditeurs, nb_postes
+    postes_par_ville = m / max(nb_villes, 1)
+    voeux_total = n * nb_voeux
+
+    # Matrice float64 (auditeurs x postes), utilisée sans copie par linear_sum_assignment ;
+    # une matrice projetée depuis un fichier (option "Matrices sur disque") est comptée de même :
+    # linear_sum_assignment en lit toutes les pages, qui occupent le cache disque
+    cellules = n * m
+    dense_memoire = 8 * cellules + 64 * (n + m)
+    dense_temps = 1e-6 * voeux_total * postes_par_ville + 1e-10 * n * cellules
+
+    # Une arête par (voeu, poste de la ville) plus un poste fictif par auditeur ;
+    # coordonnées, poids, conversion CSR et structures internes du couplage
+    aretes = voeux_total * postes_par_ville + n
+    creux_memoire = 48 * aretes + 64 * (n + m)
+    creux_temps = 1e-8 * aretes * (n ** 0.5) + 1e-6 * voeux_total
+
+    # Une variable par voeu, par auditeur et par ville ; deux coefficients par variable
+    variables = voeux_total + n + nb_villes
+    flot_memoire = 400 * variables + 64 * (n + nb_villes)
+    flot_temps = 9e-7 * variables ** 1.5 + 1e-6 * voeux_total
+
+    # Mêmes variables que le flot ; la première étape domine, les suivantes portant sur un problème réduit
+    rang_maximal_memoire = flot_memoire + 16 * variables
+    rang_maximal_temps = 1.1 * flot_temps
+
+    return {
+        "hongrois_dense": {"memoire_mo": dense_memoire / MO, "temps_s": dense_temps},
+        "couplage_creux": {"memoire_mo": creux_memoire / MO, "temps_s": creux_temps},
+        "flot_villes": {"memoire_mo": flot_memoire / MO, "temps_s": flot_temps},
+        "rang_maximal": {"memoire_mo": rang_maximal_memoire / MO, "temps_s": rang_maximal_temps},
+    }
+
+
+def planifier_resolution(
+    nb_auditeurs: int,
+    nb_postes: int,
+    nb_villes: int,
+    nb_voeux: int,
+    budget_mo: float,
+    rang_maximal: bool = False,
+) -> Dict[str, Any]:
+    """Choisit le solveur le plus rapide dont la mémoire estimée respecte le budget.
+
+    Le solveur rang_maximal est le seul possible pour la méthode "rang maximal", et n'est pas
+    utilisé pour les autres méthodes.
+
+    Args:
+        nb_auditeurs (int): Nombre total d'auditeurs
+        nb_postes (int): Nombre total de postes disponibles
+        nb_villes (int): Nombre de villes ayant au moins un poste
+        nb_voeux (int): Nombre de voeux par auditeur
+        budget_mo (float): Mémoire maximale autorisée pour la résolution (Mo)
+        rang_maximal (bool): True pour la méthode "rang maximal"
+
+    Returns:
+        Dict[str, Any]: Plan de résolution contenant :
+            - solveur (str) : Nom du solveur retenu
+            - budget_mo (float) : Budget mémoire utilisé pour le choix
+            - estimations (Dict) : Mémoire et temps estimés de chaque solveur
+
+    Raises:
+        ValueError: S'il y a moins de postes que d'auditeurs
+        MemoryError: Si aucun solveur ne respecte le budget mémoire
+    """
+    verifier_nombre_postes(nb_auditeurs, nb_postes)
+    estimations = estimer_solveurs(nb_auditeurs, nb_postes, nb_villes, nb_voeux)
+    for estimation in estimations.values():
+        estimation["memoire_mo"] = float(estimation["memoire_mo"])
+        estimation["temps_s"] = float(estimation["temps_s"])
+        estimation["dans_budget"] = bool(estimation["memoire_mo"] <= budget_mo)
+
+    possibles = [nom for nom in estimations if (nom == "rang_maximal") == rang_maximal]
+    candidats = [nom for nom in possibles if estimations[nom]["dans_budget"]]
+    if not candidats:
+        memoire_min = min(estimations[nom]["memoire_mo"] for nom in possibles)
+        raise MemoryError(
+            f"Aucune méthode de résolution ne tient dans le budget mémoire de {budget_mo:.0f} Mo "
+            f"({nb_auditeurs} auditeurs, {nb_postes} postes) : il faudrait au moins {memoire_min:.0f} Mo."
+        )
+    solveur = min(candidats, key=lambda nom: estimations[nom]["temps_s"])
+    return {"solveur": solveur, "budget_mo": budget_mo, "estimations": estimations}
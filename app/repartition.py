@@ -13,31 +13,103 @@ Contact: paul.dc.simon@gmail.com
 
 from __future__ import annotations
 
+import json
 import numpy as np
 import os
 import streamlit as st
-import matplotlib.pyplot as plt
 import pandas as pd
-from scipy import optimize
 from utils import *
 from villes import Ville
-from typing import Dict, Tuple, List, Any, Union
+from planification import planifier_resolution
+from solveurs import SOLVEURS, valeurs_marginales_capacite
+from apercu import apercu_glouton
+from couts import valider_couts, METHODE_RANG_MAXIMAL
+from typing import Dict, Tuple, List, Any, Union, TYPE_CHECKING
+
+# matplotlib et scipy sont coûteux à importer : ils ne sont chargés qu'au moment
+# où un graphique ou une résolution est effectivement demandé.
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
 
 seed = 42
 RESULTS_PATH = os.path.join(os.path.expanduser('~'), 'Documents', 'resultats_repartition_stage_juridictionnel')
 os.makedirs(RESULTS_PATH, exist_ok=True)
+# Fichier de configuration, utilisé par les modes hors de l'application (lot, balayage)
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "config", "parameters.json")
+
+
+def initialiser_processus() -> None:
+    """Réduit les avertissements de streamlit, utilisé hors de l'application (processus principal et pool).
+
+    streamlit donne son propre niveau à chacun de ses loggers et le réapplique à partir de l'option
+    logger.level lors de la lecture de sa configuration (au premier st.write) : l'option est donc
+    modifiée, puis appliquée aux loggers existants.
+    """
+    from streamlit import config, logger
+
+    config.set_option("logger.level", "error")
+    logger.set_log_level("error")
+
+
+def construire_villes(postes_df: pd.DataFrame) -> Dict[str, Ville]:
+    """Crée les villes ayant au moins un poste, dans l'ordre de postes_df.
+
+    Args:
+        postes_df (pd.DataFrame): DataFrame des postes (colonnes Ville, Postes, Couleur)
+
+    Returns:
+        Dict[str, Ville]: Dictionnaire d'objets Ville indexés par leur nom
+    """
+    villes = {}
+    for index, row in postes_df.iterrows():
+        if row["Postes"] > 0:
+            villes[row["Ville"]] = Ville(index, row["Ville"], row["Postes"], row["Couleur"])
+    return villes
+
+
+def preparer_voeux(
+    voeux_df: pd.DataFrame, params_dict: Dict[str, Any], voeux_libres: bool = False
+) -> pd.DataFrame:
+    """Restreint les voeux au nombre de voeux params_dict["Voeux"] et applique l'option 'Voeux libres'.
+
+    Avec 'Voeux libres', les contraintes de couleurs sont levées : params_dict est modifié en place.
+
+    Args:
+        voeux_df (pd.DataFrame): DataFrame contenant les voeux des auditeurs
+        params_dict (Dict[str, Any]): Dictionnaire contenant les paramètres de configuration
+        voeux_libres (bool): True si les voeux sont faits sans contraintes de couleurs
+
+    Returns:
+        pd.DataFrame: Voeux restreints aux colonnes id_auditeur, v_1, ..., v_<Voeux>
+    """
+    available_v_columns = [col for col in voeux_df.columns if col.startswith("v_")]
+    needed_columns = ["id_auditeur"] + available_v_columns[: params_dict["Voeux"]]
+    voeux_df = voeux_df[needed_columns]
+
+    if voeux_libres:
+        nb_voeux = len([col for col in voeux_df.columns if col.startswith("v_")])
+        params_dict["Voeux"] = nb_voeux
+        params_dict["Noires max"] = nb_voeux
+        params_dict["Noires ou rouges max"] = nb_voeux
+        params_dict["Vertes min"] = 0
+    return voeux_df
+
 
 def verification_et_analyse_des_voeux(
-    postes_df: pd.DataFrame, voeux_df: pd.DataFrame, params_dict: Dict[str, Any]
+    postes_df: pd.DataFrame,
+    voeux_df: pd.DataFrame,
+    params_dict: Dict[str, Any],
+    dossier_resultats: str = RESULTS_PATH,
+    graphiques: bool = True,
 ) -> Tuple[
     Dict[str, Ville],
     pd.DataFrame,
     pd.DataFrame,
     int,
     int,
-    plt.Figure,
-    plt.Figure,
-    plt.Figure,
+    plt.Figure | None,
+    plt.Figure | None,
+    plt.Figure | None,
 ]:
     """Analyse et vérifie les voeux des auditeurs et prépare les données pour la répartition.
 
@@ -62,6 +134,8 @@ def verification_et_analyse_des_voeux(
             - Vertes min : Nombre minimum de villes vertes
             - Methodes : Liste des méthodes de calcul des coûts
             - Penalite : Pénalité par défaut pour les affectations
+        dossier_resultats (str): Dossier où sont écrits la distribution des voeux et le log des voeux non valides
+        graphiques (bool): Si False, les graphiques ne sont pas générés (None est renvoyé à leur place)
 
     Returns:
         Tuple contenant :
@@ -70,19 +144,16 @@ def verification_et_analyse_des_voeux(
             - voeux_df (pd.DataFrame) : DataFrame des voeux mise à jour après vérification
             - nb_postes (int) : Nombre total de postes disponibles
             - nb_auditeurs (int) : Nombre total d'auditeurs
-            - top_30_demandes (plt.Figure) : Graphique montrant les 30 villes les plus demandées
-            - top_30_voeux1 (plt.Figure) : Graphique montrant les 30 villes les plus demandées en premier voeu
-            - taux_assignation (plt.Figure) : Graphique montrant l'analyse des taux d'affectation
+            - top_30_demandes (plt.Figure | None) : Graphique montrant les 30 villes les plus demandées
+            - top_30_voeux1 (plt.Figure | None) : Graphique montrant les 30 villes les plus demandées en premier voeu
+            - taux_assignation (plt.Figure | None) : Graphique montrant l'analyse des taux d'affectation
     """
     voeux = params_dict["Voeux"]
     nb_postes = postes_df["Postes"].sum()
 
-    villes = {}  # Dictionnaire de Villes qui contient toutes les villes
-    for index, row in postes_df.iterrows():
-        if row["Postes"] > 0:
-            villes[row["Ville"]] = Ville(index, row["Ville"], row["Postes"])
-        else:
-            st.write("Ville ignorée (aucun poste) :", row["Ville"])
+    villes = construire_villes(postes_df)  # Dictionnaire de Villes qui contient toutes les villes
+    for ville in postes_df.loc[postes_df["Postes"] <= 0, "Ville"]:
+        st.write("Ville ignorée (aucun poste) :", ville)
 
     st.write(f"Il y a {nb_postes} postes disponibles dans {len(postes_df)} villes.")
     st.divider()
@@ -97,7 +168,10 @@ def verification_et_analyse_des_voeux(
     )
 
     erreurs, valides, trop_de_voeux = verification_voeux(
-        voeux_df, postes_df, params_dict
+        voeux_df,
+        postes_df,
+        params_dict,
+        log_file=os.path.join(dossier_resultats, "logs", "voeux_non_valides.txt"),
     )
 
     st.write(f"Voeux valides: {valides} | Voeux invalides: {erreurs}.")
@@ -119,13 +193,18 @@ def verification_et_analyse_des_voeux(
     postes_df, nb_postes_non_demandes = distribution_des_voeux(
         villes, voeux_df, postes_df, voeux
     )
-    postes_df.to_csv(os.path.join(RESULTS_PATH, "distribution_voeux.csv"), index=False)
+    postes_df.to_csv(os.path.join(dossier_resultats, "distribution_voeux.csv"), index=False)
 
     if (nb_postes_non_demandes > marge) or (erreurs > 0):
         st.write(
             f"Il y aura donc au moins {max(nb_postes_non_demandes - marge, erreurs)} auditeurs placés hors de leurs voeux (dont {erreurs} pour cause de voeux invalides)."
         )
 
+    if not graphiques:
+        return villes, postes_df, voeux_df, nb_postes, nb_auditeurs, None, None, None
+
+    import matplotlib.pyplot as plt
+
     top_30_demandes, ax1 = plt.subplots(1, 1)
     top_30_voeux1, ax2 = plt.subplots(1, 1)
     ax_demandes = (
@@ -178,6 +257,32 @@ def verification_et_analyse_des_voeux(
     )
 
 
+def apercu_de_la_repartition(
+    villes: Dict[str, Ville],
+    original_voeux_df: pd.DataFrame,
+    params_dict: Dict[str, Any],
+    methode: str,
+) -> Dict[str, Any]:
+    """Calcule en temps quasi linéaire un aperçu de la répartition et une borne inférieure du coût optimal.
+
+    Les auditeurs sont mélangés avec la même graine que dans executer_la_repartition (voir apercu.py).
+
+    Args:
+        villes (Dict[str, Ville]) : Dictionnaire d'objets Ville représentant chaque TJ
+        original_voeux_df (pd.DataFrame) : DataFrame contenant les voeux des auditeurs
+        params_dict (Dict[str, Any]) : Dictionnaire des paramètres de configuration
+        methode (str) : Méthode de calcul des coûts à utiliser
+
+    Returns:
+        Dict[str, Any]: Aperçu de la répartition (voir apercu.apercu_glouton)
+    """
+    repartition_df = original_voeux_df.sample(frac=1, random_state=seed).reset_index()
+    # La méthode "rang maximal" n'a pas de coûts : l'aperçu est calculé avec les coûts linéaires
+    if methode == METHODE_RANG_MAXIMAL:
+        methode = "linéaire"
+    return apercu_glouton(repartition_df, villes, params_dict, methode)
+
+
 def executer_la_repartition(
     villes: Dict[str, Ville],
     original_voeux_df: pd.DataFrame,
@@ -186,14 +291,19 @@ def executer_la_repartition(
     params_dict: Dict[str, Union[int, List[str]]],
     methode: str,
     file_name: str | None = None,
-) -> Tuple[pd.DataFrame, plt.Figure, float, float, float]:
+    dossier_resultats: str = RESULTS_PATH,
+    graphiques: bool = True,
+) -> Tuple[pd.DataFrame, plt.Figure | None, float, float, float, Dict[str, Any], pd.Series]:
     """Exécute la répartition des auditeurs sur les postes en utilisant la méthode spécifiée.
 
     Cette fonction :
-    1. Crée une matrice de coûts basée sur les voeux et les contraintes
-    2. Utilise l'algo scipy.optimize.linear_sum_assignmentpour trouver la répartition optimale
-    3. Génère les résultats et les visualisations
-    4. Sauvegarde les résultats en CSV
+    1. Vérifie que les coûts de la méthode sont finis, positifs et inférieurs à la pénalité
+       (la méthode "rang maximal" n'a pas de coûts, voir solveurs.resoudre_rang_maximal)
+    2. Estime la mémoire et le temps de chaque solveur et choisit le plus rapide dans le budget mémoire
+    3. Résout le problème d'affectation avec le solveur retenu (voir solveurs.py)
+    4. Calcule la valeur marginale d'un poste supplémentaire dans chaque TJ
+    5. Génère les résultats et les visualisations
+    6. Sauvegarde les résultats en CSV et le rapport d'exécution en JSON
 
     Args:
         villes (Dict[str, Ville]) : Dictionnaire d'objets Ville représentant chaque TJ
@@ -201,49 +311,65 @@ def executer_la_repartition(
         nb_auditeurs (int) : Nombre total d'auditeurs à répartir
         nb_postes (int) : Nombre total de postes disponibles
         params_dict (Dict[str, Union[int, List[str]]]) : Dictionnaire des paramètres de configuration
-        methode (str) : Méthode de calcul des coûts à utiliser ('linéaire', 'carré', ou 'exp')
+        methode (str) : Méthode de calcul des coûts à utiliser (voir couts.py)
         file_name (str | None) : Nom optionnel du fichier d'entrée pour la sauvegarde des résultats
+        dossier_resultats (str) : Dossier où sont écrits les résultats et le rapport d'exécution
+        graphiques (bool) : Si False, le graphique des affectations n'est pas généré (None est renvoyé)
 
     Returns:
         Tuple contenant :
             - voeux_df (pd.DataFrame) : DataFrame mise à jour avec les résultats d'affectation
-            - proportions_voeux (plt.Figure) : Figure montrant la distribution des affectations
+            - proportions_voeux (plt.Figure | None) : Figure montrant la distribution des affectations
             - proportion_top_3 (float) : Pourcentage d'auditeurs affectés à l'un de leurs 3 premiers voeux
             - proportion_top_4 (float) : Pourcentage d'auditeurs affectés à l'un de leurs 4 premiers voeux
             - moyenne_globale (float) : Numéro moyen du voeu auquel les auditeurs sont affectés
+            - plan (Dict[str, Any]) : Solveur retenu et estimations de mémoire et de temps de chaque solveur
+            - valeurs_marginales (pd.Series) : Baisse du coût optimal apportée par un poste supplémentaire dans chaque TJ
+              (pour la méthode "rang maximal", nombre d'auditeurs hors voeux évités multiplié par la pénalité)
+
+    Raises:
+        ValueError: Si la méthode est inconnue, si ses coûts ne sont pas utilisables
+            ou s'il y a moins de postes que d'auditeurs
+        MemoryError: Si aucun solveur ne respecte le budget mémoire 'Budget memoire (Mo)'
     """
+    valider_couts(methode, params_dict, [ville.couleur for ville in villes.values()])
+
     # Création d'une copie pour éviter de modifier les données originales
     voeux_df = original_voeux_df.copy()
 
-    # Construction d'une liste qui mappe chaque poste à sa ville
-    # Cette liste est utilisée pour convertir les indices de la matrice en noms de villes
-    indice_vers_ville = []
-    i = 0
-    for ville in villes.values():
-        for _ in range(ville.capacite):
-            indice_vers_ville.append(ville.nom)
-            ville.colonnes.append(
-                i
-            )  # Stockage des indices de colonnes pour chaque ville
-            i = i + 1
-
     # Mélange aléatoire des auditeurs pour éviter les biais dans l'affectation
     repartition_df = voeux_df.sample(frac=1, random_state=seed).reset_index()
 
-    # Création de la matrice de coûts et résolution du problème d'affectation
-    matrice_couts = creer_matrice_couts(
-        nb_auditeurs, nb_postes, repartition_df, villes, params_dict, methode
+    # Choix du solveur en fonction de la mémoire disponible, avant toute allocation
+    plan = planifier_resolution(
+        nb_auditeurs,
+        nb_postes,
+        len(villes),
+        repartition_df.shape[1] - 1,
+        params_dict["Budget memoire (Mo)"],
+        rang_maximal=methode == METHODE_RANG_MAXIMAL,
+    )
+
+    # Résolution du problème d'affectation : indice de la ville affectée à chaque auditeur
+    affectation = SOLVEURS[plan["solveur"]](repartition_df, villes, params_dict, methode)
+    noms_villes = list(villes)
+
+    # Valeur marginale d'un poste supplémentaire dans chaque TJ (variables duales de capacité)
+    valeurs_marginales = pd.Series(
+        valeurs_marginales_capacite(
+            repartition_df, villes, params_dict, methode, affectation
+        ),
+        index=noms_villes,
     )
-    row_ind, col_ind = optimize.linear_sum_assignment(matrice_couts)
 
     # Initialisation des colonnes pour stocker les résultats
     voeux_df["assignation"] = ""
     voeux_df["voeu_realise"] = np.nan
 
     # Affectation des postes aux auditeurs en utilisant les résultats de l'algorithme
-    for index in row_ind:
+    for index, indice_ville in enumerate(affectation):
         id_auditeur = repartition_df.loc[index, "id_auditeur"]
-        assignation = indice_vers_ville[col_ind[index]]
+        assignation = noms_villes[indice_ville]
         # Récupération du numéro du voeu réalisé (1er, 2ème, etc.)
         voeux_df.loc[id_auditeur, "voeu_realise"] = recuperer_num_voeu(
             voeux_df.loc[id_auditeur][:-2].values, assignation
@@ -253,22 +379,26 @@ def executer_la_repartition(
     # Conversion des résultats en int et sauvegarde
     voeux_df["voeu_realise"] = voeux_df["voeu_realise"].astype(int)
     voeux_df.to_csv(
-        os.path.join(RESULTS_PATH, f"resultats_{file_name[:-4]}_{methode}.csv")
+        os.path.join(dossier_resultats, f"resultats_{file_name[:-4]}_{methode}.csv")
     )
 
     # Calcul des statistiques sur les affectations
     proportions = voeux_df["voeu_realise"].value_counts().sort_index()
 
     # Création du graphique en camembert des affectations
-    proportions_voeux = plt.figure()
-    # Utilisation d'une palette de couleurs adaptée aux daltoniens (color-blind friendly)
-    colorblind_palette = ["#377eb8", "#ff7f00", "#4daf4a", "#f781bf", "#a65628", "#984ea3", "#999999", "#e41a1c", "#dede00"]
-    proportions.plot.pie(
-        autopct="%1.1f%%",
-        ylabel="",
-        title=f"Méthode utilisée: {methode}",
-        colors=colorblind_palette[:len(proportions)]
-    )
+    proportions_voeux = None
+    if graphiques:
+        import matplotlib.pyplot as plt
+
+        proportions_voeux = plt.figure()
+        # Utilisation d'une palette de couleurs adaptée aux daltoniens (color-blind friendly)
+        colorblind_palette = ["#377eb8", "#ff7f00", "#4daf4a", "#f781bf", "#a65628", "#984ea3", "#999999", "#e41a1c", "#dede00"]
+        proportions.plot.pie(
+            autopct="%1.1f%%",
+            ylabel="",
+            title=f"Méthode utilisée: {methode}",
+            colors=colorblind_palette[:len(proportions)]
+        )
 
     # Calcul des indicateurs de performance
     proportion_top_3 = (
@@ -281,10 +411,58 @@ def executer_la_repartition(
         "voeu_realise"
     ].mean()  # Moyenne du rang des voeux réalisés
 
+    # Rapport d'exécution : solveur retenu, estimations et indicateurs
+    rapport = {
+        "methode": methode,
+        "plan": plan,
+        "proportion_top_3": float(proportion_top_3),
+        "proportion_top_4": float(proportion_top_4),
+        "moyenne_globale": float(moyenne_globale),
+        "valeurs_marginales": valeurs_marginales.to_dict(),
+    }
+    with open(
+        os.path.join(dossier_resultats, f"rapport_{file_name[:-4]}_{methode}.json"),
+        "w",
+        encoding="utf-8",
+    ) as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=4)
+
     return (
         voeux_df,
         proportions_voeux,
         proportion_top_3,
         proportion_top_4,
         moyenne_globale,
+        plan,
+        valeurs_marginales,
     )
+
+
+def ajouter_valeurs_marginales(
+    postes_df: pd.DataFrame,
+    valeurs_marginales: pd.Series,
+    methode: str,
+    penalite: int,
+    dossier_resultats: str = RESULTS_PATH,
+) -> pd.DataFrame:
+    """Ajoute à la distribution des voeux les valeurs marginales des TJs pour une méthode.
+
+    Deux colonnes sont ajoutées :
+        - valeur_marginale_<methode> : baisse du coût optimal apportée par un poste supplémentaire
+        - hors_voeux_evites_<methode> : nombre d'auditeurs hors voeux en moins grâce à ce poste
+
+    Args:
+        postes_df (pd.DataFrame): DataFrame de la distribution des voeux (voir distribution_des_voeux)
+        valeurs_marginales (pd.Series): Valeur marginale de chaque TJ, indexée par le nom de la ville
+        methode (str): Méthode de calcul des coûts utilisée
+        penalite (int): Pénalité appliquée aux affectations hors voeux
+        dossier_resultats (str): Dossier où est sauvegardée la distribution des voeux
+
+    Returns:
+        pd.DataFrame: Distribution des voeux mise à jour, également sauvegardée en CSV
+    """
+    valeurs = postes_df["Ville"].map(valeurs_marginales)
+    postes_df[f"valeur_marginale_{methode}"] = valeurs
+    postes_df[f"hors_voeux_evites_{methode}"] = np.rint(valeurs / penalite)
+    postes_df.to_csv(os.path.join(dossier_resultats, "distribution_voeux.csv"), index=False)
+    return postes_df
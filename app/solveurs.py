@@ -0,0 +1,452 @@
+"""
+Ce fichier implémente les différentes méthodes de résolution du problème d'affectation :
+    - hongrois_dense: Algorithme hongrois sur la matrice de coûts complète (auditeurs x postes),
+    - couplage_creux: Couplage de poids minimal sur le graphe creux des voeux (auditeurs x postes),
+    - flot_villes: Flot de coût minimal au niveau des villes, résolu comme un programme linéaire.
+
+Les trois méthodes donnent une répartition de même coût optimal ; elles diffèrent par leur
+consommation mémoire et leur temps de calcul (voir planification.py).
+
+Le solveur rang_maximal, utilisé uniquement pour la méthode "rang maximal", ne minimise pas un coût
+mais donne le meilleur profil des rangs au sens lexicographique, par flots successifs.
+
+Chaque solveur renvoie, pour chaque ligne de repartition_df, l'indice de la ville affectée
+dans l'ordre du dictionnaire villes.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import os
+import pandas as pd
+from utils import creer_matrice_couts, cle_matrice_couts, extraire_aretes_voeux, developper_aretes_postes
+from villes import Ville
+from couts import METHODE_RANG_MAXIMAL
+from planification import verifier_nombre_postes
+from typing import Dict, Any
+
+# Dossier des matrices de coûts projetées en mémoire (option "Matrices sur disque")
+MATRICES_PATH = os.path.join(os.path.expanduser('~'), 'Documents', 'resultats_repartition_stage_juridictionnel', 'matrices')
+
+
+def capacites_villes(villes: Dict[str, Ville]) -> np.ndarray:
+    """Renvoie le nombre de postes de chaque ville, dans l'ordre du dictionnaire villes."""
+    return np.array([ville.capacite for ville in villes.values()], dtype=np.int64)
+
+
+def completer_hors_voeux(affectation: np.ndarray, capacites: np.ndarray) -> np.ndarray:
+    """Affecte les auditeurs non placés (indice -1) aux postes restés libres.
+
+    Le coût d'une affectation hors voeux étant la pénalité quel que soit le TJ,
+    l'ordre de remplissage n'a pas d'incidence sur l'optimalité.
+
+    Args:
+        affectation (np.ndarray): Indice de la ville affectée à chaque auditeur, -1 si non placé
+        capacites (np.ndarray): Nombre de postes de chaque ville
+
+    Returns:
+        np.ndarray: Affectation complétée
+
+    Raises:
+        ValueError: S'il n'y a pas assez de postes libres pour les auditeurs non placés
+    """
+    restants = capacites - np.bincount(
+        affectation[affectation >= 0], minlength=len(capacites)
+    )
+    postes_libres = np.repeat(np.arange(len(capacites)), np.maximum(restants, 0))
+    non_places = np.flatnonzero(affectation < 0)
+    if len(non_places) > len(postes_libres):
+        raise ValueError(
+            f"Nombre de postes insuffisant : {len(non_places)} auditeurs non placés "
+            f"pour {len(postes_libres)} postes libres."
+        )
+    affectation[non_places] = postes_libres[: len(non_places)]
+    return affectation
+
+
+def resoudre_hongrois_dense(
+    repartition_df: pd.DataFrame,
+    villes: Dict[str, Ville],
+    params_dict: Dict[str, Any],
+    methode: str,
+) -> np.ndarray:
+    """Résout l'affectation avec scipy.optimize.linear_sum_assignment sur la matrice de coûts complète.
+
+    Avec l'option "Matrices sur disque", la matrice est construite dans MATRICES_PATH et partagée
+    entre les exécutions (et les processus) ayant les mêmes données d'entrée.
+    """
+    from scipy import optimize
+
+    capacites = capacites_villes(villes)
+    poste_vers_ville = np.repeat(np.arange(len(villes)), capacites)
+
+    fichier = None
+    aretes = None
+    if params_dict["Matrices sur disque"]:
+        # La clé porte sur les coûts calculés : les arêtes sont extraites une fois et réutilisées
+        os.makedirs(MATRICES_PATH, exist_ok=True)
+        aretes = extraire_aretes_voeux(repartition_df, villes, params_dict, methode)
+        cle = cle_matrice_couts(len(repartition_df), villes, params_dict, aretes)
+        fichier = os.path.join(MATRICES_PATH, f"couts_{cle}.npy")
+
+    matrice_couts = creer_matrice_couts(
+        len(repartition_df),
+        int(capacites.sum()),
+        repartition_df,
+        villes,
+        params_dict,
+        methode,
+        fichier=fichier,
+        aretes=aretes,
+    )
+    row_ind, col_ind = optimize.linear_sum_assignment(matrice_couts)
+
+    affectation = np.full(len(repartition_df), -1, dtype=np.int64)
+    affectation[row_ind] = poste_vers_ville[col_ind]
+    return completer_hors_voeux(affectation, capacites)
+
+
+def resoudre_couplage_creux(
+    repartition_df: pd.DataFrame,
+    villes: Dict[str, Ville],
+    params_dict: Dict[str, Any],
+    methode: str,
+) -> np.ndarray:
+    """Résout l'affectation avec scipy.sparse.csgraph.min_weight_full_bipartite_matching.
+
+    Seules les arêtes correspondant à un voeu sont stockées. Chaque auditeur dispose en plus
+    d'un poste fictif qui lui est propre, de coût égal à la pénalité, représentant une
+    affectation hors voeux ; le couplage complet existe donc toujours.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+    nb_auditeurs = len(repartition_df)
+    capacites = capacites_villes(villes)
+    nb_postes = int(capacites.sum())
+
+    lignes, indices_villes, _, couts = extraire_aretes_voeux(
+        repartition_df, villes, params_dict, methode
+    )
+    # Chaque voeu (auditeur, ville) est développé en une arête par poste de la ville
+    lignes_postes, colonnes_postes, nb_aretes = developper_aretes_postes(lignes, indices_villes, capacites)
+
+    # Les poids sont décalés de 1 : un coût nul ne doit pas être confondu avec une absence d'arête
+    poids = np.concatenate(
+        (
+            np.repeat(couts, nb_aretes).astype(np.float64) + 1,
+            np.full(nb_auditeurs, float(params_dict["Penalite"]) + 1),
+        )
+    )
+    biadjacence = coo_matrix(
+        (
+            poids,
+            (
+                np.concatenate((lignes_postes, np.arange(nb_auditeurs))),
+                np.concatenate((colonnes_postes, nb_postes + np.arange(nb_auditeurs))),
+            ),
+        ),
+        shape=(nb_auditeurs, nb_postes + nb_auditeurs),
+    ).tocsr()
+    _, col_ind = min_weight_full_bipartite_matching(biadjacence)
+
+    poste_vers_ville = np.repeat(np.arange(len(villes)), capacites)
+    affectation = np.full(nb_auditeurs, -1, dtype=np.int64)
+    places = col_ind < nb_postes
+    affectation[places] = poste_vers_ville[col_ind[places]]
+    return completer_hors_voeux(affectation, capacites)
+
+
+def penalite_equivalente(
+    nb_auditeurs: int, couts: np.ndarray, penalite: float
+) -> float:
+    """Réduit la pénalité à la plus petite valeur donnant la même répartition optimale.
+
+    Les coûts des voeux étant positifs, une pénalité supérieure à nb_auditeurs x (coût maximal
+    d'un voeu) fait toujours primer le nombre d'auditeurs placés dans leurs voeux, comme la
+    pénalité d'origine. Une pénalité plus faible évite les problèmes numériques des solveurs
+    de programmation linéaire.
+    """
+    cout_max = float(np.abs(couts).max()) if len(couts) else 0.0
+    return min(float(penalite), nb_auditeurs * cout_max + 1)
+
+
+def contraintes_flot_villes(
+    nb_auditeurs: int, lignes: np.ndarray, indices_villes: np.ndarray, nb_villes: int
+):
+    """Construit les contraintes du flot entre auditeurs et villes.
+
+    Variables : une par voeu (auditeur, ville), une par auditeur pour une affectation hors voeux
+    et une par ville pour les postes pourvus hors voeux.
+
+    Returns:
+        Tuple contenant :
+            - A_eq (csr_matrix): Chaque auditeur est affecté une fois (voeu ou hors voeux), puis
+              une ligne d'équilibre : les auditeurs hors voeux occupent autant de postes libres
+            - A_ub (csr_matrix): Capacité de chaque ville
+    """
+    from scipy.sparse import coo_matrix, vstack
+
+    nb_aretes = len(lignes)
+    nb_variables = nb_aretes + nb_auditeurs + nb_villes
+    # Chaque auditeur est affecté une fois (voeu ou hors voeux)
+    auditeurs = coo_matrix(
+        (
+            np.ones(nb_aretes + nb_auditeurs),
+            (
+                np.concatenate((lignes, np.arange(nb_auditeurs))),
+                np.arange(nb_aretes + nb_auditeurs),
+            ),
+        ),
+        shape=(nb_auditeurs, nb_variables),
+    )
+    # Les auditeurs hors voeux occupent autant de postes libres
+    equilibre = coo_matrix(
+        (
+            np.concatenate((np.ones(nb_auditeurs), -np.ones(nb_villes))),
+            (
+                np.zeros(nb_auditeurs + nb_villes, dtype=np.int64),
+                nb_aretes + np.arange(nb_auditeurs + nb_villes),
+            ),
+        ),
+        shape=(1, nb_variables),
+    )
+    # Capacité de chaque ville
+    capacite = coo_matrix(
+        (
+            np.ones(nb_aretes + nb_villes),
+            (
+                np.concatenate((indices_villes, np.arange(nb_villes))),
+                np.concatenate((np.arange(nb_aretes), nb_aretes + nb_auditeurs + np.arange(nb_villes))),
+            ),
+        ),
+        shape=(nb_villes, nb_variables),
+    )
+    return vstack((auditeurs, equilibre)).tocsr(), capacite.tocsr()
+
+
+def resoudre_flot_villes(
+    repartition_df: pd.DataFrame,
+    villes: Dict[str, Ville],
+    params_dict: Dict[str, Any],
+    methode: str,
+) -> np.ndarray:
+    """Résout l'affectation comme un flot de coût minimal entre auditeurs et villes.
+
+    Le problème est agrégé au niveau des villes (une contrainte de capacité par TJ) et résolu
+    comme un programme linéaire par scipy.optimize.linprog (HiGHS). La matrice des contraintes
+    étant totalement unimodulaire, la solution de base renvoyée par le simplexe est entière.
+
+    Les variables et les contraintes sont celles de contraintes_flot_villes.
+    """
+    from scipy import optimize
+
+    nb_auditeurs = len(repartition_df)
+    nb_villes = len(villes)
+    capacites = capacites_villes(villes)
+    verifier_nombre_postes(nb_auditeurs, int(capacites.sum()))
+    lignes, indices_villes, _, couts = extraire_aretes_voeux(
+        repartition_df, villes, params_dict, methode
+    )
+    nb_aretes = len(lignes)
+    penalite = penalite_equivalente(nb_auditeurs, couts, params_dict["Penalite"])
+
+    c = np.concatenate(
+        (couts.astype(np.float64), np.full(nb_auditeurs, penalite), np.zeros(nb_villes))
+    )
+    A_eq, A_ub = contraintes_flot_villes(nb_auditeurs, lignes, indices_villes, nb_villes)
+    resultat = optimize.linprog(
+        c,
+        A_ub=A_ub,
+        b_ub=capacites,
+        A_eq=A_eq,
+        b_eq=np.concatenate((np.ones(nb_auditeurs), [0])),
+        bounds=(0, None),
+        method="highs-ds",
+    )
+    if not resultat.success:
+        raise RuntimeError(f"Échec de la résolution du flot : {resultat.message}")
+
+    affectation = np.full(nb_auditeurs, -1, dtype=np.int64)
+    choisies = np.flatnonzero(resultat.x[:nb_aretes] > 0.5)
+    affectation[lignes[choisies]] = indices_villes[choisies]
+    return completer_hors_voeux(affectation, capacites)
+
+
+def resoudre_rang_maximal(
+    repartition_df: pd.DataFrame,
+    villes: Dict[str, Ville],
+    params_dict: Dict[str, Any],
+    methode: str,
+) -> np.ndarray:
+    """Résout l'affectation de rang maximal par flots successifs au niveau des villes.
+
+    Le profil des rangs obtenus est le meilleur au sens lexicographique : le nombre d'auditeurs
+    hors voeux est minimal (comme avec la pénalité des autres méthodes), puis, à nombre égal,
+    le nombre de 1er voeux est maximal, puis celui des 2ème voeux, etc. Aucun coût n'est utilisé.
+
+    Chaque étape k résout le flot de resoudre_flot_villes avec pour objectif le nombre de voeux de
+    rang k (la première étape y ajoute le nombre d'auditeurs hors voeux, pondéré par nb_auditeurs + 1
+    pour primer). Les variables duales d'une étape restreignent la suivante aux solutions optimales
+    de celle-ci : les variables de coût réduit strictement positif sont supprimées et les capacités
+    de variable duale non nulle deviennent des égalités. Le problème rétrécit ainsi d'étape en étape
+    et reste totalement unimodulaire (solution entière) ; les étapes s'arrêtent dès que chaque
+    auditeur n'a plus qu'une affectation possible. Les coefficients restent petits, contrairement
+    à des coûts exponentiels.
+    """
+    from scipy import optimize
+    from scipy.sparse import vstack
+
+    nb_auditeurs = len(repartition_df)
+    nb_villes = len(villes)
+    capacites = capacites_villes(villes)
+    verifier_nombre_postes(nb_auditeurs, int(capacites.sum()))
+    # Seuls les rangs sont utilisés, les coûts linéaires extraits avec eux sont ignorés
+    lignes, indices_villes, rangs, _ = extraire_aretes_voeux(
+        repartition_df, villes, params_dict, "linéaire"
+    )
+    nb_aretes = len(lignes)
+    A_eq, A_ub = contraintes_flot_villes(nb_auditeurs, lignes, indices_villes, nb_villes)
+    b_eq = np.concatenate((np.ones(nb_auditeurs), [0]))
+    # Auditeur de chaque variable (-1 pour les postes hors voeux des villes)
+    auditeur_variable = np.concatenate(
+        (lignes, np.arange(nb_auditeurs), np.full(nb_villes, -1))
+    )
+
+    actives = np.ones(A_eq.shape[1], dtype=bool)
+    serrees = np.zeros(nb_villes, dtype=bool)
+    x = None
+    nb_rangs = int(rangs.max()) + 1 if nb_aretes else 0
+    for etape in range(nb_rangs):
+        # Étape k : maximiser les voeux de rang k ; à l'étape 0, minimiser d'abord les auditeurs hors voeux
+        c = np.zeros(A_eq.shape[1])
+        if etape == 0:
+            c[nb_aretes : nb_aretes + nb_auditeurs] = nb_auditeurs + 1.0
+        c[:nb_aretes][rangs == etape] = -1.0
+        if x is not None and not c[actives].any():
+            continue
+
+        A_eq_etape = A_eq[:, actives]
+        A_ub_etape = A_ub[:, actives]
+        resultat = optimize.linprog(
+            c[actives],
+            A_ub=A_ub_etape[~serrees] if (~serrees).any() else None,
+            b_ub=capacites[~serrees] if (~serrees).any() else None,
+            A_eq=vstack((A_eq_etape, A_ub_etape[serrees])).tocsr(),
+            b_eq=np.concatenate((b_eq, capacites[serrees])),
+            bounds=(0, None),
+            method="highs-ds",
+        )
+        if not resultat.success:
+            raise RuntimeError(f"Échec de la résolution du flot (étape {etape}) : {resultat.message}")
+        x = np.zeros(A_eq.shape[1])
+        x[actives] = resultat.x
+
+        # Variables duales : égalités (auditeurs, équilibre, capacités serrées) puis capacités restantes
+        duales_eq = resultat.eqlin.marginals
+        duales_capacite = np.zeros(nb_villes)
+        duales_capacite[serrees] = duales_eq[len(b_eq) :]
+        if (~serrees).any():
+            duales_capacite[~serrees] = resultat.ineqlin.marginals
+        couts_reduits = (
+            c[actives]
+            - A_eq_etape.T @ duales_eq[: len(b_eq)]
+            - A_ub_etape.T @ duales_capacite
+        )
+        # Restriction aux solutions optimales de l'étape (écarts complémentaires) ; la matrice étant
+        # totalement unimodulaire et l'objectif entier, les duales de base et coûts réduits sont entiers
+        actives[np.flatnonzero(actives)[couts_reduits > 0.5]] = False
+        serrees |= np.abs(duales_capacite) > 0.5
+
+        # Arrêt lorsque chaque auditeur n'a plus qu'une affectation possible
+        possibles = np.bincount(
+            auditeur_variable[actives & (auditeur_variable >= 0)], minlength=nb_auditeurs
+        )
+        if np.all(possibles == 1):
+            break
+
+    affectation = np.full(nb_auditeurs, -1, dtype=np.int64)
+    if x is not None:
+        choisies = np.flatnonzero(x[:nb_aretes] > 0.5)
+        affectation[lignes[choisies]] = indices_villes[choisies]
+    return completer_hors_voeux(affectation, capacites)
+
+
+def valeurs_marginales_capacite(
+    repartition_df: pd.DataFrame,
+    villes: Dict[str, Ville],
+    params_dict: Dict[str, Any],
+    methode: str,
+    affectation: np.ndarray,
+) -> np.ndarray:
+    """Calcule, pour chaque TJ, la baisse du coût optimal qu'apporterait un poste supplémentaire.
+
+    Ces valeurs sont les potentiels (variables duales des contraintes de capacité) du flot au
+    niveau des villes. Elles sont obtenues à partir de la répartition optimale, quel que soit le
+    solveur, par plus longs chemins (Bellman-Ford) dans le graphe résiduel des villes : un poste
+    ajouté dans la ville c permet de déplacer vers c un auditeur de la ville c', ce qui libère un
+    poste dans c', et ainsi de suite. La répartition étant optimale, ce graphe n'a pas de cycle
+    améliorant et l'algorithme converge en au plus nb_villes itérations.
+
+    Args:
+        repartition_df (pd.DataFrame): DataFrame contenant les voeux des auditeurs
+        villes (Dict[str, Ville]): Dictionnaire d'objets Ville
+        params_dict (Dict[str, Any]): Dictionnaire contenant les paramètres de configuration
+        methode (str): Méthode de calcul des coûts utilisée pour la répartition
+        affectation (np.ndarray): Indice de la ville affectée à chaque ligne de repartition_df
+
+    Returns:
+        np.ndarray: Valeur marginale d'un poste dans chaque ville, dans l'ordre de villes
+    """
+    nb_villes = len(villes)
+    penalite = float(params_dict["Penalite"])
+    if methode == METHODE_RANG_MAXIMAL:
+        # La répartition de rang maximal minimise d'abord le nombre d'auditeurs hors voeux :
+        # seule la pénalité compte, chaque valeur est un nombre d'auditeurs hors voeux évités
+        lignes, indices_villes, _, couts = extraire_aretes_voeux(
+            repartition_df, villes, params_dict, "linéaire"
+        )
+        couts = np.zeros(len(lignes))
+    else:
+        lignes, indices_villes, _, couts = extraire_aretes_voeux(
+            repartition_df, villes, params_dict, methode
+        )
+        couts = couts.astype(np.float64)
+
+    # Coût actuel de chaque auditeur (pénalité s'il est hors voeux)
+    cout_actuel = np.full(len(repartition_df), penalite)
+    actuelles = indices_villes == affectation[lignes]
+    cout_actuel[lignes[actuelles]] = couts[actuelles]
+    villes_hors_voeux = np.unique(affectation[cout_actuel == penalite])
+
+    # Déplacements possibles : un auditeur quitte sa ville actuelle pour l'un de ses autres voeux
+    lignes, indices_villes = lignes[~actuelles], indices_villes[~actuelles]
+    gains_deplacement = cout_actuel[lignes] - couts[~actuelles]
+    origines = affectation[lignes]
+
+    valeurs = np.zeros(nb_villes)
+    for _ in range(nb_villes + 1):
+        nouvelles = np.zeros(nb_villes)
+        np.maximum.at(nouvelles, indices_villes, gains_deplacement + valeurs[origines])
+        # Un auditeur hors voeux peut être déplacé sans coût vers n'importe quelle autre ville
+        if len(villes_hors_voeux):
+            ordre = villes_hors_voeux[np.argsort(-valeurs[villes_hors_voeux])]
+            meilleure = np.full(nb_villes, valeurs[ordre[0]])
+            if len(ordre) > 1:
+                meilleure[ordre[0]] = valeurs[ordre[1]]
+            else:
+                meilleure[ordre[0]] = 0.0
+            nouvelles = np.maximum(nouvelles, meilleure)
+        if np.array_equal(nouvelles, valeurs):
+            break
+        valeurs = nouvelles
+    return valeurs
+
+
+# Solveurs disponibles, indexés par le nom utilisé dans la planification
+SOLVEURS = {
+    "hongrois_dense": resoudre_hongrois_dense,
+    "couplage_creux": resoudre_couplage_creux,
+    "flot_villes": resoudre_flot_villes,
+    "rang_maximal": resoudre_rang_maximal,
+}
@@ -11,12 +11,15 @@ Contact: paul.dc.simon@gmail.com
 
 from __future__ import annotations
 
+import hashlib
 import numpy as np
 import streamlit as st
 import pandas as pd
 import os
+import tempfile
 from collections import Counter
 from villes import Ville
+from couts import calculer_couts
 from typing import Dict, List, Tuple, Union, Any, Optional
 
 ########################################################################################################################
@@ -111,7 +114,10 @@ def compte_vert(list_voeux: List[str], villes_vertes: List[str]) -> int:
 
 
 def verification_voeux(
-    voeux_df: pd.DataFrame, postes_df: pd.DataFrame, params_dict: Dict[str, Any]
+    voeux_df: pd.DataFrame,
+    postes_df: pd.DataFrame,
+    params_dict: Dict[str, Any],
+    log_file: Optional[str] = None,
 ) -> Tuple[int, int, int]:
     """Vérifie tous les voeux par rapport aux contraintes et règles spécifiées.
 
@@ -131,6 +137,7 @@ def verification_voeux(
             - Noires max : Nombre maximum de villes noires
             - Noires ou rouges max : Nombre maximum de villes rouges ou noires
             - Vertes min : Nombre minimum de villes vertes
+        log_file (Optional[str]): Chemin du fichier de log, par défaut dans le dossier des résultats
 
     Returns:
         Tuple contenant :
@@ -153,7 +160,8 @@ def verification_voeux(
     trop_de_voeux = 0
 
     # Création et/ou ouverture du fichier de log des voeux non valides
-    log_file = os.path.join(os.path.expanduser('~'), 'Documents', 'resultats_repartition_stage_juridictionnel/logs/voeux_non_valides.txt')
+    if log_file is None:
+        log_file = os.path.join(os.path.expanduser('~'), 'Documents', 'resultats_repartition_stage_juridictionnel/logs/voeux_non_valides.txt')
     os.makedirs(os.path.dirname(log_file), exist_ok=True)
     if os.path.exists(log_file):
         os.remove(log_file)
@@ -263,27 +271,37 @@ def distribution_des_voeux(
 ########################################################################################################################
 
 
-def voeu_vers_cout(num_voeu: int, methode: str) -> float:
-    """Convertit un numéro de voeu en coût selon la méthode spécifiée.
+def cle_matrice_couts(
+    nb_auditeurs: int,
+    villes: Dict[str, Ville],
+    params_dict: Dict[str, Any],
+    aretes: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+) -> str:
+    """Calcule une empreinte des données dont dépend la matrice de coûts.
+
+    L'empreinte porte sur les coûts calculés (voir extraire_aretes_voeux) plutôt que sur la définition
+    de la méthode : toute modification d'une méthode, y compris de la méthode personnalisée servant de
+    base à une autre, change l'empreinte. Deux exécutions ayant la même empreinte (mêmes arêtes, mêmes
+    coûts, mêmes capacités et même pénalité) produisent la même matrice de coûts.
 
     Args:
-        num_voeu (int): Position du voeu dans la liste de l'auditeur
-        methode (str): Méthode de calcul des coûts ('linéaire', 'carré', ou 'exp')
+        nb_auditeurs (int): Nombre total d'auditeurs
+        villes (Dict[str, Ville]): Dictionnaire d'objets Ville
+        params_dict (Dict[str, Any]): Dictionnaire contenant les paramètres de configuration
+        aretes (Tuple): Arêtes pondérées renvoyées par extraire_aretes_voeux
 
     Returns:
-        float: Coût calculé pour le voeu
-
-    Raises:
-        ValueError: Si une méthode inconnue est spécifiée
+        str: Empreinte SHA-256 en hexadécimal
     """
-    if methode == "linéaire":
-        return num_voeu
-    elif methode == "carré":
-        return num_voeu * num_voeu
-    elif methode == "exp":
-        return np.exp(num_voeu)
-    else:
-        raise ValueError(f"Méthode inconnue: {methode}")
+    lignes, indices_villes, _, couts = aretes
+    capacites = np.array([ville.capacite for ville in villes.values()], dtype=np.int64)
+    empreinte = hashlib.sha256()
+    empreinte.update(repr((int(nb_auditeurs), float(params_dict["Penalite"]))).encode("utf-8"))
+    for tableau in (capacites, lignes, indices_villes, couts):
+        tableau = np.ascontiguousarray(tableau, dtype=np.float64 if tableau is couts else np.int64)
+        empreinte.update(len(tableau).to_bytes(8, "little"))
+        empreinte.update(tableau.tobytes())
+    return empreinte.hexdigest()
 
 
 def creer_matrice_couts(
@@ -293,12 +311,18 @@ def creer_matrice_couts(
     villes: Dict[str, Ville],
     params_dict: Dict[str, Any],
     methode: str,
+    fichier: Optional[str] = None,
+    aretes: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None,
 ) -> np.ndarray:
     """Crée une matrice de coûts pour le problème d'affectation.
 
     La matrice de coûts représente le coût d'affecter chaque auditeur à chaque poste,
     en fonction de leurs voeux et de la méthode de calcul des coûts spécifiée.
 
+    Si un fichier est donné, la matrice est construite directement dans ce fichier (.npy, float64)
+    puis projetée en mémoire en copie sur écriture : les processus qui utilisent le même fichier
+    partagent les mêmes pages, et une matrice déjà construite est réutilisée sans être recalculée.
+
     Args:
         nb_auditeurs (int): Nombre total d'auditeurs
         nb_postes (int): Nombre total de postes disponibles
@@ -306,29 +330,125 @@ def creer_matrice_couts(
         villes (Dict[str, Ville]): Dictionnaire d'objets Ville
         params_dict (Dict[str, Any]): Dictionnaire contenant les paramètres de configuration
         methode (str): Méthode de calcul des coûts à utiliser
+        fichier (Optional[str]): Fichier .npy où construire la matrice (voir cle_matrice_couts)
+        aretes (Optional[Tuple]): Arêtes déjà extraites par extraire_aretes_voeux, recalculées sinon
 
     Returns:
         np.ndarray: Matrice de coûts de dimension (nb_auditeurs, nb_postes)
     """
     penalite = params_dict["Penalite"]
+    if fichier is not None and os.path.exists(fichier):
+        return np.load(fichier, mmap_mode="c")
+
     # lignes : nb_auditeurs ; colonnes : nb_postes
-    matrice_couts = np.full((nb_auditeurs, nb_postes), penalite)
-
-    # Remplissage de la matrice :
-    # pour chaque auditeur, on regarde les voeux dans l'ordre :
-    # pour chaque voeu, on calcul le coût de l'affectation de l'auditeur à la ville
-    # on met le coût dans la matrice
-    for ligne, row in repartition_df.iterrows():
-        voeux_aud = row[1:].dropna().values
-        for num_voeu in range(len(voeux_aud)):
-            voeu_actuel = voeux_aud[num_voeu]
-            colonnes = villes[voeu_actuel].colonnes
-            for col in colonnes:
-                cout = voeu_vers_cout(num_voeu, methode)
-                matrice_couts[ligne, col] = cout
+    # Matrice float64 : les coûts fractionnaires sont conservés et linear_sum_assignment ne la copie pas
+    if fichier is None:
+        matrice_couts = np.full((nb_auditeurs, nb_postes), float(penalite))
+    else:
+        # Écriture dans un fichier temporaire propre à cet appel : une autre session (thread) ou un autre
+        # processus ne peut ni lire une matrice incomplète ni écrire dans le même fichier temporaire
+        descripteur, fichier_temporaire = tempfile.mkstemp(
+            dir=os.path.dirname(fichier), prefix=os.path.basename(fichier), suffix=".tmp"
+        )
+        os.close(descripteur)
+        matrice_couts = np.lib.format.open_memmap(
+            fichier_temporaire, mode="w+", dtype=np.float64, shape=(nb_auditeurs, nb_postes)
+        )
+        matrice_couts[:] = penalite
+
+    # Remplissage de la matrice : les coûts de tous les voeux sont calculés en une seule fois,
+    # puis chaque voeu (auditeur, ville) est recopié sur tous les postes de la ville
+    if aretes is None:
+        aretes = extraire_aretes_voeux(repartition_df, villes, params_dict, methode)
+    lignes, indices_villes, _, couts = aretes
+    capacites = np.array([ville.capacite for ville in villes.values()], dtype=np.int64)
+    lignes_postes, colonnes_postes, nb_aretes = developper_aretes_postes(lignes, indices_villes, capacites)
+    matrice_couts[lignes_postes, colonnes_postes] = np.repeat(couts, nb_aretes)
+
+    if fichier is not None:
+        matrice_couts.flush()
+        del matrice_couts
+        try:
+            os.replace(fichier_temporaire, fichier)
+        except OSError:
+            # Matrice construite entre-temps par une autre session ou un autre processus (fichier cible
+            # en cours d'utilisation, ou fichier temporaire déjà supprimé avec le dossier) : elle est réutilisée
+            if not os.path.exists(fichier):
+                raise
+            if os.path.exists(fichier_temporaire):
+                os.remove(fichier_temporaire)
+        return np.load(fichier, mmap_mode="c")
     return matrice_couts
 
 
+def extraire_aretes_voeux(
+    repartition_df: pd.DataFrame,
+    villes: Dict[str, Ville],
+    params_dict: Dict[str, Any],
+    methode: str,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Extrait les voeux sous forme d'arêtes (auditeur, ville) pondérées, sans construire de matrice dense.
+
+    Le rang d'un voeu est sa position parmi les voeux renseignés de l'auditeur. Les coûts de tous les voeux
+    sont calculés en une seule fois par la méthode du registre (voir couts.py), en fonction du rang et de
+    la couleur de la ville, en float64.
+
+    Args:
+        repartition_df (pd.DataFrame): DataFrame contenant les voeux des auditeurs
+        villes (Dict[str, Ville]): Dictionnaire d'objets Ville
+        params_dict (Dict[str, Any]): Dictionnaire contenant les paramètres de configuration
+        methode (str): Méthode de calcul des coûts à utiliser
+
+    Returns:
+        Tuple contenant :
+            - lignes (np.ndarray): Indice de la ligne de l'auditeur dans repartition_df
+            - indices_villes (np.ndarray): Indice de la ville souhaitée dans l'ordre de villes
+            - rangs (np.ndarray): Rang du voeu (0 pour le premier voeu)
+            - couts (np.ndarray): Coût de l'affectation de l'auditeur à la ville
+    """
+    indices = {nom: i for i, nom in enumerate(villes)}
+    voeux = repartition_df.iloc[:, 1:].to_numpy()
+    renseignes = pd.notna(voeux)
+    rangs_complets = np.cumsum(renseignes, axis=1) - 1
+    lignes, colonnes = np.nonzero(renseignes)
+    indices_villes = np.array([indices.get(v, -1) for v in voeux[lignes, colonnes]], dtype=np.int64)
+    rangs = rangs_complets[lignes, colonnes]
+
+    # Les villes sans poste ne font pas partie des villes et ne peuvent pas être affectées
+    connues = indices_villes >= 0
+    lignes, indices_villes, rangs = lignes[connues], indices_villes[connues], rangs[connues]
+
+    couleurs = np.array([ville.couleur for ville in villes.values()], dtype=object)
+    couts = calculer_couts(methode, rangs, couleurs[indices_villes], params_dict)
+    return lignes, indices_villes, rangs, couts
+
+
+def developper_aretes_postes(
+    lignes: np.ndarray, indices_villes: np.ndarray, capacites: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Développe chaque voeu (auditeur, ville) en une arête par poste de la ville.
+
+    Les postes sont numérotés ville par ville, dans l'ordre de villes.
+
+    Args:
+        lignes (np.ndarray): Indice de la ligne de l'auditeur de chaque voeu
+        indices_villes (np.ndarray): Indice de la ville de chaque voeu
+        capacites (np.ndarray): Nombre de postes de chaque ville
+
+    Returns:
+        Tuple contenant :
+            - lignes_postes (np.ndarray): Indice de la ligne de l'auditeur de chaque arête
+            - colonnes_postes (np.ndarray): Indice du poste de chaque arête
+            - nb_aretes (np.ndarray): Nombre d'arêtes de chaque voeu
+    """
+    premier_poste = np.concatenate(([0], np.cumsum(capacites)[:-1]))
+    nb_aretes = capacites[indices_villes]
+    lignes_postes = np.repeat(lignes, nb_aretes)
+    decalages = np.arange(nb_aretes.sum()) - np.repeat(np.cumsum(nb_aretes) - nb_aretes, nb_aretes)
+    colonnes_postes = np.repeat(premier_poste[indices_villes], nb_aretes) + decalages
+    return lignes_postes, colonnes_postes, nb_aretes
+
+
 def recuperer_num_voeu(voeux: np.ndarray, assignation: str) -> int:
     """Trouve la position d'une ville assignée dans la liste de voeux d'un auditeur.
 
@@ -11,8 +11,8 @@ Contact: paul.dc.simon@gmail.com
 
 
 class Ville:
-    def __init__(self, numero, nom, places):
+    def __init__(self, numero, nom, places, couleur=None):
         self.num = numero
         self.nom = nom
         self.capacite = places
-        self.colonnes = list()
+        self.couleur = couleur
@@ -0,0 +1,60 @@
+"""
+Ce script mesure le temps d'import des modules de l'application (python -X importtime)
+afin de détecter les régressions du temps de démarrage de l'exécutable.
+
+Il échoue si un module lourd (scipy, matplotlib) est importé au chargement de l'application,
+ou si le temps d'import total dépasse le seuil donné.
+
+Utilisation:
+    python scripts/mesure_imports.py [--seuil 5.0] [--top 15]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "app")
+
+# Modules qui ne doivent être chargés qu'au moment d'une résolution ou d'un graphique
+MODULES_DIFFERES = ["scipy", "matplotlib"]
+
+
+def mesurer_imports(module: str) -> dict:
+    """Importe un module dans un nouvel interpréteur et renvoie le temps cumulé (en s) par module importé."""
+    sortie = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    temps = {}
+    for ligne in sortie.splitlines():
+        if not ligne.startswith("import time:") or "cumulative" in ligne:
+            continue
+        _, cumule, nom = ligne[len("import time:"):].split("|")
+        temps[nom.strip()] = int(cumule) / 1e6
+    return temps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seuil", type=float, default=None, help="Temps d'import maximal (s)")
+    parser.add_argument("--top", type=int, default=15, help="Nombre de modules affichés")
+    args = parser.parse_args()
+
+    temps = mesurer_imports("repartition")
+    total = temps.get("repartition", 0.0)
+
+    print(f"Temps d'import de l'application : {total:.3f} s")
+    for nom, duree in sorted(temps.items(), key=lambda x: -x[1])[: args.top]:
+        print(f"  {duree:8.3f} s  {nom}")
+
+    erreurs = [m for m in MODULES_DIFFERES if m in temps]
+    if erreurs:
+        print(f"ERREUR ! Modules lourds importés au démarrage : {erreurs}")
+    if args.seuil is not None and total > args.seuil:
+        print(f"ERREUR ! Temps d'import supérieur au seuil ({args.seuil:.3f} s)")
+        erreurs.append("seuil")
+    sys.exit(1 if erreurs else 0)
@@ -0,0 +1,274 @@
+"""
+Ce fichier implémente un service HTTP local permettant aux autres outils d'obtenir une répartition
+sans lancer l'application Streamlit.
+
+Un pool de processus est démarré une seule fois : chaque processus importe numpy, scipy, pandas et
+les modules de l'application et charge config/parameters.json au démarrage. Les requêtes identiques
+(même empreinte des données) sont dédupliquées, et le nombre de requêtes en cours est borné.
+
+Requêtes:
+    GET  /sante        -> état du service
+    POST /repartition  -> corps JSON :
+        {
+            "postes": [{"Ville": ..., "Postes": ..., "Couleur": ...}, ...] ou contenu CSV,
+            "voeux": [{"id_auditeur": ..., "v_1": ..., ...}, ...] ou contenu CSV,
+            "parametres": {...}  (facultatif, remplace les paramètres de parameters.json,
+                                  "Voeux libres" compris)
+        }
+
+Utilisation:
+    python service_repartition.py [--port 8502] [--processus N] [--en-attente M]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def resource_path(relative_path):
+    """Get absolute path to resource (handles PyInstaller bundle or dev)."""
+    base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, relative_path)
+
+
+# Nombre de résultats conservés pour la déduplication des requêtes
+TAILLE_CACHE = 64
+
+# Paramètres chargés une fois par processus du pool
+_params_dict = None
+
+
+def _initialiser_processus(budget_par_processus: float) -> None:
+    """Importe les modules lourds et charge les paramètres une fois pour toutes dans le processus."""
+    global _params_dict
+
+    sys.path.insert(0, resource_path("app"))
+
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    import scipy.optimize  # noqa: F401
+    import scipy.sparse.csgraph  # noqa: F401
+    import repartition
+
+    # Après l'import de streamlit, qui fixe le niveau de ses loggers
+    repartition.initialiser_processus()
+
+    with open(resource_path(os.path.join("config", "parameters.json")), "r", encoding="utf-8") as f:
+        _params_dict = json.load(f)
+    _params_dict["Budget memoire (Mo)"] = budget_par_processus
+
+
+def _pret() -> int:
+    """Tâche vide utilisée pour démarrer les processus du pool."""
+    return os.getpid()
+
+
+def _lire_tableau(donnees):
+    """Construit un DataFrame à partir d'une liste d'enregistrements ou d'un contenu CSV."""
+    import pandas as pd
+
+    if isinstance(donnees, str):
+        return pd.read_csv(io.StringIO(donnees))
+    return pd.DataFrame(donnees)
+
+
+def repartir(cle: str, requete: dict) -> dict:
+    """Vérifie les voeux et exécute la répartition pour chaque méthode, dans un processus du pool.
+
+    Args:
+        cle (str): Empreinte de la requête, utilisée pour le dossier des résultats
+        requete (dict): Corps de la requête (voir l'en-tête du fichier)
+
+    Returns:
+        dict: Résultats de la répartition pour chaque méthode
+    """
+    from repartition import (
+        RESULTS_PATH,
+        preparer_voeux,
+        verification_et_analyse_des_voeux,
+        executer_la_repartition,
+    )
+
+    params_dict = dict(_params_dict, **requete.get("parametres", {}))
+    dossier = os.path.join(RESULTS_PATH, "service", cle[:16])
+    os.makedirs(dossier, exist_ok=True)
+
+    postes_df = _lire_tableau(requete["postes"])
+    voeux_df = preparer_voeux(
+        _lire_tableau(requete["voeux"]), params_dict, params_dict.get("Voeux libres", False)
+    )
+    villes, postes_df, voeux_df, nb_postes, nb_auditeurs, *_ = verification_et_analyse_des_voeux(
+        postes_df, voeux_df, params_dict, dossier_resultats=dossier, graphiques=False
+    )
+
+    resultats = {"cle": cle, "nb_auditeurs": int(nb_auditeurs), "nb_postes": int(nb_postes), "methodes": {}}
+    for methode in params_dict["Methodes"]:
+        (
+            res_voeux_df,
+            _,
+            proportion_top_3,
+            proportion_top_4,
+            moyenne_globale,
+            plan,
+            valeurs_marginales,
+        ) = executer_la_repartition(
+            villes,
+            voeux_df,
+            nb_auditeurs,
+            nb_postes,
+            params_dict,
+            methode,
+            file_name="service.csv",
+            dossier_resultats=dossier,
+            graphiques=False,
+        )
+        resultats["methodes"][methode] = {
+            "solveur": plan["solveur"],
+            "proportion_top_3": float(proportion_top_3),
+            "proportion_top_4": float(proportion_top_4),
+            "moyenne_globale": float(moyenne_globale),
+            "hors_voeux": int((res_voeux_df["voeu_realise"] == 100).sum()),
+            "affectations": res_voeux_df.reset_index()[
+                ["id_auditeur", "assignation", "voeu_realise"]
+            ].to_dict(orient="records"),
+            "valeurs_marginales": valeurs_marginales.to_dict(),
+        }
+    return resultats
+
+
+class ServiceRepartition:
+    """Pool de processus chauds avec déduplication des requêtes et nombre de requêtes en cours borné."""
+
+    def __init__(self, processus: int, en_attente: int, budget_mo: float):
+        self.processus = processus
+        self.pool = ProcessPoolExecutor(
+            max_workers=processus,
+            initializer=_initialiser_processus,
+            initargs=(budget_mo / processus,),
+        )
+        self.places = threading.BoundedSemaphore(en_attente)
+        self.verrou = threading.RLock()
+        self.taches = OrderedDict()  # empreinte -> Future, en cours ou terminée
+
+        # Démarrage de tous les processus avant la première requête
+        for tache in [self.pool.submit(_pret) for _ in range(processus)]:
+            tache.result()
+
+    @staticmethod
+    def empreinte(requete: dict) -> str:
+        """Empreinte SHA-256 du contenu de la requête, indépendante de l'ordre des clés."""
+        return hashlib.sha256(
+            json.dumps(requete, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    def soumettre(self, requete: dict):
+        """Renvoie la tâche correspondant à la requête, en réutilisant une tâche identique existante.
+
+        Returns:
+            Future | None: Tâche de répartition, ou None si trop de requêtes sont en cours
+        """
+        cle = self.empreinte(requete)
+        with self.verrou:
+            tache = self.taches.get(cle)
+            if tache is not None:
+                self.taches.move_to_end(cle)
+                return tache
+            if not self.places.acquire(blocking=False):
+                return None
+            tache = self.pool.submit(repartir, cle, requete)
+            tache.add_done_callback(lambda t: self._terminer(cle, t))
+            self.taches[cle] = tache
+            while len(self.taches) > TAILLE_CACHE:
+                self.taches.popitem(last=False)
+            return tache
+
+    def _terminer(self, cle: str, tache) -> None:
+        """Libère une place et oublie les tâches en erreur pour qu'elles puissent être relancées."""
+        self.places.release()
+        if tache.exception() is not None:
+            with self.verrou:
+                if self.taches.get(cle) is tache:
+                    del self.taches[cle]
+
+    def en_cours(self) -> int:
+        """Nombre de requêtes en cours de traitement."""
+        with self.verrou:
+            return sum(not tache.done() for tache in self.taches.values())
+
+
+def creer_gestionnaire(service: ServiceRepartition):
+    """Crée la classe de gestion des requêtes HTTP associée au service."""
+
+    class Gestionnaire(BaseHTTPRequestHandler):
+        def _repondre(self, code: int, contenu: dict) -> None:
+            corps = json.dumps(
+                contenu, ensure_ascii=False, default=lambda o: o.item() if hasattr(o, "item") else str(o)
+            ).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def do_GET(self):
+            if self.path != "/sante":
+                return self._repondre(404, {"erreur": f"Chemin inconnu: {self.path}"})
+            self._repondre(
+                200, {"statut": "ok", "processus": service.processus, "en_cours": service.en_cours()}
+            )
+
+        def do_POST(self):
+            if self.path != "/repartition":
+                return self._repondre(404, {"erreur": f"Chemin inconnu: {self.path}"})
+            try:
+                requete = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if not isinstance(requete, dict):
+                    raise ValueError("le corps doit être un objet JSON")
+                if not {"postes", "voeux"} <= set(requete):
+                    raise ValueError("les champs 'postes' et 'voeux' sont obligatoires")
+            except ValueError as e:
+                return self._repondre(400, {"erreur": f"Requête invalide: {e}"})
+
+            tache = service.soumettre(requete)
+            if tache is None:
+                return self._repondre(503, {"erreur": "Trop de requêtes en cours, réessayer plus tard"})
+            try:
+                self._repondre(200, tache.result())
+            except MemoryError as e:
+                self._repondre(507, {"erreur": str(e)})
+            except (ValueError, KeyError) as e:
+                # Données ou paramètres de la requête incorrects (méthode inconnue, colonne manquante, ...)
+                self._repondre(400, {"erreur": f"Requête invalide: {type(e).__name__}: {e}"})
+            except Exception as e:
+                self._repondre(500, {"erreur": f"{type(e).__name__}: {e}"})
+
+    return Gestionnaire
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service HTTP local de répartition des auditeurs")
+    parser.add_argument("--hote", default="127.0.0.1", help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=8502, help="Port d'écoute")
+    parser.add_argument("--processus", type=int, default=2, help="Nombre de processus du pool")
+    parser.add_argument("--en-attente", type=int, default=8, help="Nombre maximal de requêtes en cours")
+    args = parser.parse_args()
+
+    with open(resource_path(os.path.join("config", "parameters.json")), "r", encoding="utf-8") as f:
+        budget_mo = json.load(f)["Budget memoire (Mo)"]
+    service = ServiceRepartition(args.processus, args.en_attente, budget_mo)
+    serveur = ThreadingHTTPServer((args.hote, args.port), creer_gestionnaire(service))
+    print(f"Service de répartition à l'écoute sur http://{args.hote}:{args.port} ({args.processus} processus)")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+        service.pool.shutdown()